@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+bench_fix_json_quotes.py -- Benchmark and regression check for fix_json_quotes.py.
+
+Generates synthetic paper JSON in the paper_content.json shape (title, abstracts,
+chapters[].content / chapters[].footnotes[], references), breaks it the way the
+Write tool does (escaped \\" inside values become bare "), and measures:
+
+  * throughput (MB/s) of the repair path, the valid-JSON fast path, the chunked
+    streaming path and the original character-by-character reference;
+  * repair accuracy against the known-good JSON the corpus was generated from;
+  * byte-identity with the reference state machine (any difference is a
+    regression, whatever the accuracy).
+
+Usage:
+    python3 bench_fix_json_quotes.py
+    python3 bench_fix_json_quotes.py --docs 50 --chapters 20 --json bench.json
+    python3 bench_fix_json_quotes.py --ambiguous-rate 0.05   # add cases the heuristic cannot repair
+    python3 bench_fix_json_quotes.py --write-corpus ./corpus # dump broken / known-good pairs
+
+Exit status: 0 = identical to the reference and accuracy >= --min-accuracy, 1 otherwise.
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fix_json_quotes import fix_json_quotes, fix_json_quotes_stream
+
+_SENTENCES = [
+    "罗马共和国的公民大会具有直接民主的特征",
+    "元老院掌握财政与外交大权",
+    "平民保民官可以否决执政官的命令",
+    "格拉古兄弟的改革触动了土地占有者的利益",
+    "行省总督的权力在共和末期不断膨胀",
+    "这一时期的史料多出自后世作家的追述",
+    "铭文材料为我们提供了另一种视角",
+]
+_WORDS = ["和平", "帝国", "公民", "自由", "共和", "祖制", "人民", "正统"]
+
+# Injection patterns: {w} is the quoted word.  Every pattern here is one the
+# state machine can repair (the character after the closing quote is not an
+# ASCII post-string token).
+_PATTERNS = {
+    "inline": '他称之为"{w}"的制度',
+    "cjk_punct": '所谓"{w}"，即',
+    "spaced": '即 "{w}" 一词',
+    "trailing": '史称"{w}"',
+}
+# Ambiguous: the inner closing quote is followed by an ASCII , or : -- the
+# heuristic reads it as the end of the string and cannot recover.
+_AMBIGUOUS = {
+    "ascii_comma": '所谓"{w}", 即',
+    "ascii_colon": '"{w}": 一说',
+}
+
+_CIRCLED = "①②③④⑤⑥⑦⑧⑨⑩⑪⑫⑬⑭⑮⑯⑰⑱⑲⑳"
+
+
+# ─────────────────────────────── Reference ────────────────────────────────────
+
+def _reference_fix_json_quotes(text):
+    """The original character-by-character state machine, kept verbatim as the oracle."""
+    result = []
+    i = 0
+    in_string = False
+    escape_next = False
+
+    while i < len(text):
+        c = text[i]
+
+        if escape_next:
+            result.append(c)
+            escape_next = False
+            i += 1
+            continue
+
+        if c == '\\':
+            result.append(c)
+            escape_next = True
+            i += 1
+            continue
+
+        if not in_string:
+            if c == '"':
+                in_string = True
+            result.append(c)
+        else:
+            if c == '"':
+                j = i + 1
+                while j < len(text) and text[j] in ' \t':
+                    j += 1
+                next_char = text[j] if j < len(text) else ''
+                if next_char in ',}]:\n\r':
+                    in_string = False
+                    result.append(c)
+                else:
+                    result.append('\\')
+                    result.append(c)
+            else:
+                result.append(c)
+
+        i += 1
+
+    return ''.join(result)
+
+
+# ─────────────────────────────── Generator ────────────────────────────────────
+
+class _Generator:
+    def __init__(self, rnd, quote_rate, ambiguous_rate):
+        self.rnd = rnd
+        self.quote_rate = quote_rate
+        self.ambiguous_rate = ambiguous_rate
+        self.injected = {}
+
+    def _inject(self, text):
+        rnd = self.rnd
+        if rnd.random() >= self.quote_rate:
+            return text
+        if rnd.random() < self.ambiguous_rate:
+            kind, pattern = rnd.choice(sorted(_AMBIGUOUS.items()))
+        else:
+            kind, pattern = rnd.choice(sorted(_PATTERNS.items()))
+        self.injected[kind] = self.injected.get(kind, 0) + 1
+        return text + pattern.format(w=rnd.choice(_WORDS))
+
+    def sentence(self):
+        return self._inject(self.rnd.choice(_SENTENCES)) + "。"
+
+    def chapter(self, no, paragraphs, footnotes):
+        rnd = self.rnd
+        paras = []
+        marker = 0
+        for _ in range(paragraphs):
+            para = "".join(self.sentence() for _ in range(rnd.randint(2, 6)))
+            if marker < min(footnotes, len(_CIRCLED)) and rnd.random() < 0.6:
+                para += _CIRCLED[marker]
+                marker += 1
+            paras.append(para)
+        return {
+            "title": self._inject("第%d章 " % no + rnd.choice(_SENTENCES)[:8]),
+            "content": "\n".join(paras),
+            "footnotes": [
+                {"index": k + 1,
+                 "text": self._inject("作者：《%s》" % rnd.choice(_SENTENCES)[:10])
+                 + "，北京：中华书局，19%02d年，第%d页。" % (rnd.randint(50, 99), rnd.randint(1, 400))}
+                for k in range(footnotes)
+            ],
+        }
+
+    def paper(self, chapters, paragraphs, footnotes):
+        return {
+            "title": self._inject("论" + self.rnd.choice(_WORDS)),
+            "author": "任济坤",
+            "abstract_cn": "".join(self.sentence() for _ in range(6)),
+            "abstract_en": "This paper examines the Roman Republic.",
+            "keywords_cn": list(self.rnd.sample(_WORDS, 4)),
+            "keywords_en": ["Rome", "Republic"],
+            "chapters": [self.chapter(i + 1, paragraphs, footnotes) for i in range(chapters)],
+            "references": [self._inject("参考文献%d：《%s》" % (i + 1, s)) for i, s in enumerate(_SENTENCES)],
+        }
+
+
+def generate_corpus(args):
+    """Return [(broken_text, good_text)] plus the per-kind injection counts."""
+    rnd = random.Random(args.seed)
+    gen = _Generator(rnd, args.quote_rate, args.ambiguous_rate)
+    corpus = []
+    for _ in range(args.docs):
+        good = json.dumps(gen.paper(args.chapters, args.paragraphs, args.footnotes),
+                          ensure_ascii=False, indent=2)
+        # The generated values contain no other backslashes, so every \" is an injected quote.
+        corpus.append((good.replace('\\"', '"'), good))
+    return corpus, gen.injected
+
+
+# ─────────────────────────────── Measurement ──────────────────────────────────
+
+def _string_leaves(obj):
+    if isinstance(obj, str):
+        yield obj
+    elif isinstance(obj, dict):
+        for k, v in obj.items():
+            yield k
+            yield from _string_leaves(v)
+    elif isinstance(obj, list):
+        for v in obj:
+            yield from _string_leaves(v)
+
+
+def _stream_fix(text, chunk_size):
+    out = io.StringIO()
+    fix_json_quotes_stream(io.StringIO(text), out, chunk_size)
+    return out.getvalue()
+
+
+def _throughput(fn, texts, repeat):
+    size = sum(len(t.encode("utf-8")) for t in texts)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for t in texts:
+            fn(t)
+        best = min(best, time.perf_counter() - start)
+    return size / 1e6 / best if best > 0 else float("inf")
+
+
+def measure_accuracy(corpus):
+    """Documents repaired exactly, documents that parse, and injected string values restored."""
+    exact = parsed = 0
+    values_total = values_ok = 0
+    for broken, good in corpus:
+        fixed = fix_json_quotes(broken)
+        exact += fixed == good
+        expected = list(_string_leaves(json.loads(good)))
+        try:
+            got = list(_string_leaves(json.loads(fixed)))
+            parsed += 1
+        except json.JSONDecodeError:
+            got = []
+        for i, value in enumerate(expected):
+            if '"' in value:
+                values_total += 1
+                values_ok += i < len(got) and got[i] == value
+    n = len(corpus) or 1
+    return {
+        "documents_exact": exact / n,
+        "documents_parsed": parsed / n,
+        "values": values_ok / values_total if values_total else 1.0,
+        "values_total": values_total,
+    }
+
+
+def check_identity(corpus, chunk_size):
+    """Indices of documents where the current implementation differs from the reference."""
+    diffs = []
+    for i, (broken, good) in enumerate(corpus):
+        for text in (broken, good):
+            ref = _reference_fix_json_quotes(text)
+            if fix_json_quotes(text) != ref or _stream_fix(text, chunk_size) != ref:
+                diffs.append(i)
+                break
+    return diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fix_json_quotes 吞吐量与修复准确率基准")
+    parser.add_argument("--docs", type=int, default=20, help="生成的论文份数（默认 20）")
+    parser.add_argument("--chapters", type=int, default=8, help="每篇章数（默认 8）")
+    parser.add_argument("--paragraphs", type=int, default=20, help="每章段落数（默认 20）")
+    parser.add_argument("--footnotes", type=int, default=10, help="每章脚注数（默认 10）")
+    parser.add_argument("--quote-rate", type=float, default=0.3,
+                        help="每个文本单元注入裸引号的概率（默认 0.3）")
+    parser.add_argument("--ambiguous-rate", type=float, default=0.0,
+                        help="注入中不可修复（引号后紧跟 ASCII , 或 :）的比例（默认 0）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="每项计时取最好成绩的重复次数")
+    parser.add_argument("--chunk-size", type=int, default=4096,
+                        help="流式路径的分块字符数（默认 4096，刻意偏小以覆盖跨块边界）")
+    parser.add_argument("--min-accuracy", type=float, default=1.0,
+                        help="被注入字符串值的修复准确率下限（默认 1.0）")
+    parser.add_argument("--json", help="结果另存为 JSON")
+    parser.add_argument("--write-corpus", help="把 broken / good 样本写入该目录")
+    args = parser.parse_args()
+
+    corpus, injected = generate_corpus(args)
+    broken = [b for b, _ in corpus]
+    good = [g for _, g in corpus]
+    size_mb = sum(len(t.encode("utf-8")) for t in broken) / 1e6
+
+    if args.write_corpus:
+        os.makedirs(args.write_corpus, exist_ok=True)
+        for i, (b, g) in enumerate(corpus):
+            for name, text in (("broken", b), ("good", g)):
+                path = os.path.join(args.write_corpus, "paper_%03d.%s.json" % (i, name))
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(text)
+
+    throughput = {
+        "repair": _throughput(fix_json_quotes, broken, args.repeat),
+        "fast_path": _throughput(fix_json_quotes, good, args.repeat),
+        "stream": _throughput(lambda t: _stream_fix(t, args.chunk_size), broken, args.repeat),
+        "reference": _throughput(_reference_fix_json_quotes, broken, args.repeat),
+    }
+    accuracy = measure_accuracy(corpus)
+    diffs = check_identity(corpus, args.chunk_size)
+
+    print("语料: %d 篇, %.2f MB, 注入 %s" % (
+        len(corpus), size_mb,
+        ", ".join("%s=%d" % kv for kv in sorted(injected.items())) or "无"))
+    print()
+    print("吞吐量 (MB/s)")
+    for name, mbps in throughput.items():
+        print("  %-10s %8.2f" % (name, mbps))
+    print("  加速比     %8.2fx (repair / reference)" % (throughput["repair"] / throughput["reference"]))
+    print()
+    print("准确率")
+    print("  文档完全一致  %6.1f%%" % (accuracy["documents_exact"] * 100))
+    print("  文档可解析    %6.1f%%" % (accuracy["documents_parsed"] * 100))
+    print("  含引号字段    %6.1f%%  (%d 个)" % (accuracy["values"] * 100, accuracy["values_total"]))
+    print()
+    if diffs:
+        print("ERR 与参考实现输出不一致: 文档 %s" % ", ".join(map(str, diffs[:10])), file=sys.stderr)
+    else:
+        print("OK  与参考实现逐字节一致（整体 / 流式）")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "params": vars(args),
+                "corpus_mb": round(size_mb, 3),
+                "injected": injected,
+                "throughput_mbps": {k: round(v, 3) for k, v in throughput.items()},
+                "accuracy": accuracy,
+                "identical_to_reference": not diffs,
+            }, f, ensure_ascii=False, indent=2)
+
+    failed = bool(diffs)
+    if accuracy["values"] < args.min_accuracy:
+        print("ERR 修复准确率 %.4f 低于 --min-accuracy %.4f" % (accuracy["values"], args.min_accuracy),
+              file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,13 +9,38 @@ citation_audit.py - NotebookLM 来源引注审计
 
 用法：
     python citation_audit.py --input citations.json --report audit_report.json
+    python citation_audit.py --input citations.jsonl --report audit_report.json --stream
+    python citation_audit.py --input citations.json --report audit_report.json --jobs 8
+    python citation_audit.py --input citations.json --report audit_report.json \
+        --source-index sources.idx            # 另核对 quote_snippet 是否见于原文（见 source_index.py）
+
+加 --dedup 时另对全部 quote_snippet 做重复 / 近似重复聚类（见 snippet_dedup.py），
+结果列入报告 duplicate_clusters，不影响 PASS/FAIL。
 """
 
 import argparse
 import json
+import re
 import sys
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from snippet_dedup import DEFAULT_THRESHOLD as DEFAULT_DUP_THRESHOLD
+from snippet_dedup import SnippetDeduper, citation_signature
+
+SHARD_SIZE = 2000
+DEFAULT_MIN_SNIPPET_SCORE = 0.6
+
+# 片段溯源索引（--source-index）与去重开关；进程池中由 _init_worker 在每个 worker 内设置
+_snippet_index = None
+_min_snippet_score = DEFAULT_MIN_SNIPPET_SCORE
+_collect_signatures = False
 
 
 class AuditResult:
@@ -39,6 +64,142 @@ def load_json(file_path: str) -> Dict:
         sys.exit(1)
 
 
+class _JsonStreamReader:
+    """按块读取 JSON 文本，逐个解码值，内存占用只取决于单个值的大小。"""
+
+    _CHUNK = 1 << 16
+    # 已消费部分超过此长度时才丢弃，避免每次补读都复制整个缓冲区
+    _COMPACT = 1 << 16
+    _DECODER = json.JSONDecoder()
+    _WS_RE = re.compile(r"[ \t\r\n]*")
+    _NUMBER_TAIL_RE = re.compile(r"[0-9.eE+-]*")
+    _SEP_RE = re.compile(r"[ \t\r\n]*([,\]])[ \t\r\n]*")
+
+    def __init__(self, f: IO[str]):
+        self._f = f
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(self._CHUNK)
+        if not chunk:
+            self._eof = True
+            return False
+        if self._pos >= self._COMPACT:
+            self._buf = self._buf[self._pos:] + chunk
+            self._pos = 0
+        else:
+            self._buf += chunk
+        return True
+
+    def peek(self) -> str:
+        while True:
+            pos = self._WS_RE.match(self._buf, self._pos).end()
+            self._pos = pos
+            if pos < len(self._buf):
+                return self._buf[pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise json.JSONDecodeError(f"Expecting {ch!r}", self._buf, self._pos)
+        self._pos += 1
+
+    def decode(self):
+        self.peek()
+        return self._decode()
+
+    def items(self) -> Iterator:
+        """在已读过 "[" 之后逐个产出数组元素，直到 "]"。"""
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        scan = self._DECODER.scan_once
+        separator = self._SEP_RE.match
+        while True:
+            # 常见情形：元素及其后的分隔符都已在缓冲区内，直接调用 C 扫描器，
+            # 一次正则匹配吞下分隔符及两侧空白；分隔符后仍有内容，元素不可能被截断
+            buf = self._buf
+            try:
+                value, end = scan(buf, self._pos)
+                m = separator(buf, end)
+            except (StopIteration, json.JSONDecodeError):
+                m = None
+            if m is not None and m.end() < len(buf):
+                self._pos = m.end()
+                yield value
+                if m.group(1) == "]":
+                    return
+                continue
+            # 元素或分隔符跨越块边界：补读后逐步解析
+            yield self._decode()
+            if self.peek() != ",":
+                self.expect("]")
+                return
+            self._pos += 1
+            self.peek()
+
+    def _decode(self):
+        while True:
+            try:
+                value, end = self._DECODER.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # 只有数字可能在块边界被截断（如 "1500." 被解成 1500），其后必须已读到
+            # 非数字字符，否则补读后重新解码；对象、数组、字符串以定界符结尾，无需检查
+            if type(value) in (int, float) and \
+                    self._NUMBER_TAIL_RE.match(self._buf, end).end() == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+def _iter_json_array(f: IO[str], key: str) -> Iterator[Dict]:
+    """流式产出顶层对象中 key 对应数组的元素，不把整个文件读入内存。"""
+    reader = _JsonStreamReader(f)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.decode()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            reader.expect("[")
+            yield from reader.items()
+        else:
+            reader.decode()
+        if reader.peek() == ",":
+            reader.expect(",")
+            continue
+        reader.expect("}")
+        return
+
+
+def iter_citations(file_path: str) -> Iterator[Dict]:
+    """流式读取引注：.jsonl 每行一条；其余按 {"citations": [...]} 增量解析。"""
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            if file_path.endswith(".jsonl"):
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                yield from _iter_json_array(f, "citations")
+    except FileNotFoundError:
+        print(f"Error: File not found: {file_path}", file=sys.stderr)
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"Error: Invalid JSON in {file_path}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
 def validate_citation(citation: Dict, citation_index: int) -> List[Dict]:
     """
     验证单条引注的三要素。
@@ -81,21 +242,139 @@ def validate_citation(citation: Dict, citation_index: int) -> List[Dict]:
     return violations
 
 
-def audit_citations(citations: List[Dict]) -> Dict:
-    all_violations = []
-    unconfirmed_pages = []
+def _unconfirmed_page(citation: Dict, idx: int) -> Optional[Dict]:
+    page = citation.get("page_locator", "").strip()
+    if page != "页码待核":
+        return None
+    return {
+        "citation_index": idx,
+        "claim_preview": citation.get("claim", f"Citation #{idx}")[:80],
+        "notebooklm_source": citation.get("notebooklm_source", ""),
+    }
+
 
-    for idx, citation in enumerate(citations):
-        violations = validate_citation(citation, idx)
-        all_violations.extend(violations)
+def _init_worker(index_path: Optional[str], min_score: float, dedup: bool) -> None:
+    global _snippet_index, _min_snippet_score, _collect_signatures
+    _min_snippet_score = min_score
+    _collect_signatures = dedup
+    if index_path:
+        from source_index import SourceIndex
+        _snippet_index = SourceIndex(index_path)
+
+
+def _close_worker() -> None:
+    global _snippet_index
+    if _snippet_index is not None:
+        _snippet_index.close()
+        _snippet_index = None
+
+
+def _unverified_snippet(citation: Dict, idx: int) -> Optional[Dict]:
+    """片段在索引中的最佳匹配得分低于阈值时返回待核条目；空片段已计为违规，跳过。"""
+    snippet = citation.get("quote_snippet", "").strip()
+    if not snippet:
+        return None
+    source = citation.get("notebooklm_source", "")
+    match = _snippet_index.verify(snippet, source)
+    if match["score"] >= _min_snippet_score:
+        return None
+    return {
+        "citation_index": idx,
+        "claim_preview": citation.get("claim", f"Citation #{idx}")[:80],
+        "notebooklm_source": source,
+        "snippet_preview": snippet[:80],
+        "score": match["score"],
+        "best_source": match["source"],
+    }
+
+
+def _audit_shard(shard: Tuple[int, List[Dict]]) -> Dict[str, object]:
+    """审计一个分片；citation_index 使用全局下标（分片起点 + 片内偏移）。
 
-        page = citation.get("page_locator", "").strip()
-        if page == "页码待核":
-            unconfirmed_pages.append({
-                "citation_index": idx,
-                "claim_preview": citation.get("claim", f"Citation #{idx}")[:80],
-                "notebooklm_source": citation.get("notebooklm_source", ""),
-            })
+    返回 {"count": 条数, <报告明细键>: [...]}，明细键与报告中的数组同名。
+    """
+    start, citations = shard
+    result = {"count": len(citations), "violations": [], "unconfirmed_pages": [],
+              "signatures": []}
+    if _snippet_index is not None:
+        result["unverified_snippets"] = []
+    for offset, citation in enumerate(citations):
+        idx = start + offset
+        result["violations"].extend(validate_citation(citation, idx))
+        unconfirmed = _unconfirmed_page(citation, idx)
+        if unconfirmed is not None:
+            result["unconfirmed_pages"].append(unconfirmed)
+        if _snippet_index is not None:
+            unverified = _unverified_snippet(citation, idx)
+            if unverified is not None:
+                result["unverified_snippets"].append(unverified)
+        if _collect_signatures:
+            signature = citation_signature(citation, idx)
+            if signature is not None:
+                result["signatures"].append(signature)
+    return result
+
+
+def _iter_shards(citations: Iterable[Dict], size: int) -> Iterator[Tuple[int, List[Dict]]]:
+    it = iter(citations)
+    start = 0
+    while True:
+        shard = list(islice(it, size))
+        if not shard:
+            return
+        yield start, shard
+        start += len(shard)
+
+
+def _audit_sharded(citations: Iterable[Dict], jobs: int = 1,
+                   shard_size: int = SHARD_SIZE,
+                   source_index: Optional[str] = None,
+                   min_snippet_score: float = DEFAULT_MIN_SNIPPET_SCORE,
+                   dedup: bool = False) -> Iterator[Dict]:
+    """按分片审计并按输入顺序产出各分片结果。
+
+    jobs > 1 时分片分发到进程池；同时在途的分片不超过 2 * jobs 个，
+    流式输入的内存占用因此仍与总引注数无关。
+    """
+    shards = _iter_shards(citations, shard_size)
+    if jobs <= 1:
+        _init_worker(source_index, min_snippet_score, dedup)
+        try:
+            yield from map(_audit_shard, shards)
+        finally:
+            _close_worker()
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(source_index, min_snippet_score, dedup)) as pool:
+        pending = deque()
+        for shard in shards:
+            pending.append(pool.submit(_audit_shard, shard))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def audit_citations(citations: List[Dict], jobs: int = 1,
+                    source_index: Optional[str] = None,
+                    min_snippet_score: float = DEFAULT_MIN_SNIPPET_SCORE,
+                    dup_threshold: Optional[float] = None) -> Dict:
+    """给出 dup_threshold 时另做片段去重，报告增加 duplicate_clusters。"""
+    all_violations = []
+    unconfirmed_pages = []
+    unverified_snippets = []
+    deduper = SnippetDeduper(dup_threshold) if dup_threshold is not None else None
+
+    for shard in _audit_sharded(citations, jobs, source_index=source_index,
+                                min_snippet_score=min_snippet_score,
+                                dedup=deduper is not None):
+        all_violations.extend(shard["violations"])
+        unconfirmed_pages.extend(shard["unconfirmed_pages"])
+        unverified_snippets.extend(shard.get("unverified_snippets", ()))
+        if deduper is not None:
+            for signature in shard["signatures"]:
+                deduper.add(*signature)
 
     report = {
         "status": AuditResult.PASS if not all_violations else AuditResult.FAIL,
@@ -105,10 +384,108 @@ def audit_citations(citations: List[Dict]) -> Dict:
         "violations": all_violations,
         "unconfirmed_pages": unconfirmed_pages,
     }
+    if deduper is not None:
+        # 重复簇同样只提示不判 FAIL：同一片段支撑同一论断的多处引用是正常的
+        clusters = deduper.finish()
+        report["duplicate_clusters_count"] = len(clusters)
+        report["duplicate_clusters"] = clusters
+    if source_index:
+        # 片段未核实不判 FAIL：索引未收录的文献同样会得低分，需人工确认
+        report["unverified_snippets_count"] = len(unverified_snippets)
+        report["unverified_snippets"] = unverified_snippets
 
     return report
 
 
+class _JsonArrayWriter:
+    """逐项写出 JSON 数组元素（缩进与 json.dump(indent=2) 的嵌套层级一致）。"""
+
+    def __init__(self, f: IO[str]):
+        self._f = f
+        self.count = 0
+
+    def write(self, item: Dict) -> None:
+        self.write_many([item])
+
+    def write_many(self, items: List[Dict]) -> None:
+        # 整批编码一次：json.dumps(indent=...) 走纯 Python 编码器，逐项调用的准备开销可观
+        if not items:
+            return
+        text = json.dumps(items, ensure_ascii=False, indent=2)[1:-2].replace("\n", "\n  ")
+        self._f.write(("," if self.count else "") + text)
+        self.count += len(items)
+
+    def close(self) -> None:
+        self._f.write("\n  ]" if self.count else "]")
+
+
+def audit_citations_stream(citations: Iterable[Dict], report_file: IO[str],
+                           jobs: int = 1, source_index: Optional[str] = None,
+                           min_snippet_score: float = DEFAULT_MIN_SNIPPET_SCORE,
+                           dup_threshold: Optional[float] = None) -> Dict:
+    """流式审计：逐条校验并立即把违规写入报告，返回不含明细列表的汇总。
+
+    报告结构与 audit_citations() 相同，只是键顺序变为明细在前、汇总在后；
+    其余明细数组（页码待核、片段未核实）先写入临时文件，待违规数组写完后再拼接；
+    给出 dup_threshold 时重复簇需看完全部引注才能确定，最后写出；此时每条引注约保留
+    80 字节签名，内存随引注数线性增长（不去重时内存与引注总数无关）。
+    """
+    deduper = SnippetDeduper(dup_threshold) if dup_threshold is not None else None
+    spooled = ["unconfirmed_pages"]
+    if source_index:
+        spooled.append("unverified_snippets")
+
+    report_file.write('{\n  "violations": [')
+    violations_out = _JsonArrayWriter(report_file)
+    total = 0
+    spools = {key: tempfile.TemporaryFile("w+", encoding="utf-8") for key in spooled}
+    try:
+        writers = {key: _JsonArrayWriter(f) for key, f in spools.items()}
+        for shard in _audit_sharded(citations, jobs, source_index=source_index,
+                                    min_snippet_score=min_snippet_score,
+                                    dedup=deduper is not None):
+            total += shard["count"]
+            if deduper is not None:
+                for signature in shard["signatures"]:
+                    deduper.add(*signature)
+            violations_out.write_many(shard["violations"])
+            for key, writer in writers.items():
+                writer.write_many(shard[key])
+            report_file.flush()
+        violations_out.close()
+
+        for key, spool in spools.items():
+            writers[key].close()
+            report_file.write(f',\n  {json.dumps(key)}: [')
+            spool.seek(0)
+            for chunk in iter(lambda: spool.read(1 << 16), ""):
+                report_file.write(chunk)
+        if deduper is not None:
+            report_file.write(',\n  "duplicate_clusters": [')
+            clusters_out = _JsonArrayWriter(report_file)
+            for cluster in deduper.finish():
+                clusters_out.write(cluster)
+            clusters_out.close()
+    finally:
+        for spool in spools.values():
+            spool.close()
+
+    summary = {
+        "status": AuditResult.PASS if not violations_out.count else AuditResult.FAIL,
+        "total_citations": total,
+        "violations_count": violations_out.count,
+        "unconfirmed_pages_count": writers["unconfirmed_pages"].count,
+    }
+    if deduper is not None:
+        summary["duplicate_clusters_count"] = clusters_out.count
+    if source_index:
+        summary["unverified_snippets_count"] = writers["unverified_snippets"].count
+    for key, value in summary.items():
+        report_file.write(f",\n  {json.dumps(key)}: {json.dumps(value)}")
+    report_file.write("\n}")
+    return summary
+
+
 def print_report_summary(report: Dict):
     print("\n" + "=" * 60, file=sys.stderr)
     print("CITATION AUDIT REPORT (NotebookLM 模式)", file=sys.stderr)
@@ -117,8 +494,24 @@ def print_report_summary(report: Dict):
     print(f"总引注数: {report['total_citations']}", file=sys.stderr)
     print(f"违规数: {report['violations_count']}", file=sys.stderr)
     print(f"页码待核数: {report['unconfirmed_pages_count']}", file=sys.stderr)
-
-    if report["violations"]:
+    if "duplicate_clusters_count" in report:
+        print(f"片段重复簇数: {report['duplicate_clusters_count']}", file=sys.stderr)
+    if "unverified_snippets_count" in report:
+        print(f"片段未核实数: {report['unverified_snippets_count']}", file=sys.stderr)
+
+    if "violations" not in report:
+        # 流式模式：明细已直接写入报告文件
+        if report["violations_count"]:
+            print("\n违规明细见报告文件 violations 数组", file=sys.stderr)
+        else:
+            print("\n✓ 所有引注通过验证", file=sys.stderr)
+        if report["unconfirmed_pages_count"]:
+            print("⚠ 页码待核明细见报告文件 unconfirmed_pages 数组", file=sys.stderr)
+        if report.get("duplicate_clusters_count"):
+            print("⚠ 片段重复明细见报告文件 duplicate_clusters 数组", file=sys.stderr)
+        if report.get("unverified_snippets_count"):
+            print("⚠ 片段未核实明细见报告文件 unverified_snippets 数组", file=sys.stderr)
+    elif report["violations"]:
         print("\n违规详情:", file=sys.stderr)
         for v in report["violations"]:
             print(f"\n  引注 #{v['citation_index']}:", file=sys.stderr)
@@ -128,12 +521,31 @@ def print_report_summary(report: Dict):
     else:
         print("\n✓ 所有引注通过验证", file=sys.stderr)
 
-    if report["unconfirmed_pages"]:
+    if report.get("unconfirmed_pages"):
         print("\n⚠ 以下引注页码待核（需用户手动确认）:", file=sys.stderr)
         for up in report["unconfirmed_pages"]:
             print(f"  #{up['citation_index']}: {up['claim_preview']}", file=sys.stderr)
             print(f"    来源: {up['notebooklm_source'][:60]}", file=sys.stderr)
 
+    if report.get("duplicate_clusters"):
+        print("\n⚠ 以下引注的原文片段相同或近似（同一片段支撑不同论断 / 页码不一致需核查）:",
+              file=sys.stderr)
+        for dc in report["duplicate_clusters"]:
+            indices = dc["citation_indices"]
+            shown = ", ".join(f"#{i}" for i in indices[:10])
+            if len(indices) > 10:
+                shown += f" 等 {len(indices)} 条"
+            reasons = "、".join(dc["reasons"]) or "重复引用"
+            print(f"  {shown}  [{dc['kind']} {dc['min_similarity']}] {reasons}", file=sys.stderr)
+
+    if report.get("unverified_snippets"):
+        print("\n⚠ 以下引注的原文片段未在本地文献中找到（需用户手动确认）:", file=sys.stderr)
+        for us in report["unverified_snippets"]:
+            print(f"  #{us['citation_index']}: {us['claim_preview']}", file=sys.stderr)
+            print(f"    片段: {us['snippet_preview']}", file=sys.stderr)
+            print(f"    得分: {us['score']}  最接近文献: {us['best_source'] or '无'}",
+                  file=sys.stderr)
+
     print("=" * 60 + "\n", file=sys.stderr)
 
 
@@ -143,9 +555,65 @@ def main():
     )
     parser.add_argument("--input", required=True, help="含 citations 数组的输入 JSON 文件")
     parser.add_argument("--report", required=True, help="审计报告输出路径")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="流式审计：增量读取输入（支持 .jsonl），违规边校验边写入报告；"
+             "不加 --dedup 时内存占用与引注总数无关",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help=f"并行审计进程数；引注按每片 {SHARD_SIZE} 条分片，结果按原顺序合并（默认 1）",
+    )
+    parser.add_argument(
+        "--source-index",
+        help="source_index.py 建立的文献索引；给出时核对 quote_snippet 是否见于原文",
+    )
+    parser.add_argument(
+        "--min-snippet-score",
+        type=float,
+        default=DEFAULT_MIN_SNIPPET_SCORE,
+        help=f"片段匹配得分低于此值记为未核实（0–1，默认 {DEFAULT_MIN_SNIPPET_SCORE}）",
+    )
+    parser.add_argument(
+        "--dup-threshold",
+        type=float,
+        default=DEFAULT_DUP_THRESHOLD,
+        help=f"--dedup 时片段相似度（MinHash 估计的 Jaccard）达到此值即归入同一重复簇（默认 {DEFAULT_DUP_THRESHOLD}）",
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="另做片段重复 / 近似重复聚类，报告增加 duplicate_clusters"
+             "（每条引注约占 80 字节，流式模式下内存随引注数线性增长）",
+    )
 
     args = parser.parse_args()
 
+    if args.source_index and not Path(args.source_index).exists():
+        print(f"Error: File not found: {args.source_index}", file=sys.stderr)
+        sys.exit(1)
+    audit_options = {
+        "source_index": args.source_index,
+        "min_snippet_score": args.min_snippet_score,
+        "dup_threshold": args.dup_threshold if args.dedup else None,
+    }
+
+    if args.stream:
+        output_path = Path(args.report)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        print(f"正在流式审计 {args.input} ...", file=sys.stderr)
+        with open(output_path, "w", encoding="utf-8") as f:
+            report = audit_citations_stream(iter_citations(args.input), f, args.jobs,
+                                            **audit_options)
+        if not report["total_citations"]:
+            print("Warning: 输入文件中未找到 citations 数组", file=sys.stderr)
+        print_report_summary(report)
+        print(f"报告已保存至: {args.report}", file=sys.stderr)
+        sys.exit(1 if report["status"] == AuditResult.FAIL else 0)
+
     citation_data = load_json(args.input)
     citations = citation_data.get("citations", [])
 
@@ -153,7 +621,7 @@ def main():
         print("Warning: 输入文件中未找到 citations 数组", file=sys.stderr)
 
     print(f"正在审计 {len(citations)} 条引注...", file=sys.stderr)
-    report = audit_citations(citations)
+    report = audit_citations(citations, args.jobs, **audit_options)
 
     output_path = Path(args.report)
     output_path.parent.mkdir(parents=True, exist_ok=True)
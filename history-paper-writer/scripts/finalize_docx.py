@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+finalize_docx.py - 一步完成 DOCX 脚注后处理
+
+直接读取 generate_docx.cjs 生成的 .docx，在内存中为 word/settings.xml 注入
+numRestart="eachPage" 与 numFmt="decimalEnclosedCircle"（同 postprocess_footnotes.py），
+并一次写出最终文件；其余成员的压缩数据原样拷贝，不解压、不重压。
+
+取代「unpack.py → postprocess_footnotes.py → pack_simple.py」三步，不落地任何中间文件。
+
+Usage:
+    python finalize_docx.py --input output_raw.docx --output 论文.docx
+    python finalize_docx.py --input 论文.docx            # 原地处理
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ooxml_zip import copy_docx
+from postprocess_footnotes import patch_settings_xml
+
+SETTINGS_PART = "word/settings.xml"
+
+
+def finalize_docx(input_path, output_path):
+    """把脚注属性写入 input_path 的 settings.xml，结果保存到 output_path（可与输入相同）。"""
+    with zipfile.ZipFile(input_path) as zf:
+        settings = zf.read(SETTINGS_PART)
+    patched = patch_settings_xml(settings)
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=".docx", dir=output_path.parent)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            copy_docx(input_path, out, {SETTINGS_PART: patched})
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在内存中为 DOCX 注入脚注属性（圈号编号 + 每页重排）")
+    parser.add_argument("--input", required=True, help="generate_docx.cjs 生成的 .docx")
+    parser.add_argument("--output", help="输出路径（默认覆盖输入文件）")
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    if not input_path.exists():
+        print(f"Error: {input_path} not found")
+        sys.exit(1)
+    try:
+        finalize_docx(input_path, args.output or input_path)
+    except KeyError:
+        print(f"Error: {SETTINGS_PART} not found in {input_path}")
+        sys.exit(1)
+    except zipfile.BadZipFile as e:
+        print(f"Error: {input_path} is not a valid docx: {e}")
+        sys.exit(1)
+
+    print(f"✅ Finalized {args.output or input_path}")
+
+
+if __name__ == "__main__":
+    main()
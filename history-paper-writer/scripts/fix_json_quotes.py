@@ -1,124 +1,239 @@
-#!/usr/bin/env python3
-"""
-fix_json_quotes.py -- Auto-fix unescaped double quotes inside JSON string values.
-
-Problem: The Write tool converts Chinese typographic quotes "..." (U+201C/U+201D)
-to ASCII double quotes ", breaking JSON validity when those quotes appear inside
-string values.
-
-Solution: A state-machine parser that identifies whether each " is a structural
-JSON delimiter or an inner content quote, and escapes the latter.
-
-Usage:
-    python3 fix_json_quotes.py <input.json>               # fix in-place
-    python3 fix_json_quotes.py <input.json> <output.json> # write to separate file
-"""
-
-import sys
-import json
-
-
-def fix_json_quotes(text):
-    """Fix unescaped double quotes inside JSON string values.
-
-    Uses a character-by-character state machine.  Within a string, a " is
-    treated as the *end* of the string only when the next non-whitespace
-    character is one of the valid JSON post-string tokens: , } ] : newline.
-    Otherwise the " is treated as inner content and escaped with backslash.
-    """
-    result = []
-    i = 0
-    in_string = False
-    escape_next = False
-
-    while i < len(text):
-        c = text[i]
-
-        # If the previous character was a backslash, pass this char through
-        # regardless (it is already escaped).
-        if escape_next:
-            result.append(c)
-            escape_next = False
-            i += 1
-            continue
-
-        # Backslash: toggle escape flag and pass through.
-        if c == '\\':
-            result.append(c)
-            escape_next = True
-            i += 1
-            continue
-
-        if not in_string:
-            # Outside a string: only " can open one.
-            if c == '"':
-                in_string = True
-            result.append(c)
-        else:
-            # Inside a string: check whether this " closes it or is inner content.
-            if c == '"':
-                # Peek at next non-whitespace character.
-                j = i + 1
-                while j < len(text) and text[j] in ' \t':
-                    j += 1
-                next_char = text[j] if j < len(text) else ''
-
-                # Valid JSON post-string tokens (ASCII only):
-                # ,  next element in object/array
-                # }  end of object
-                # ]  end of array
-                # :  key-value separator (after a key string)
-                # \n \r  end of line (common in pretty-printed JSON)
-                if next_char in ',}]:\n\r':
-                    in_string = False
-                    result.append(c)
-                else:
-                    # Inner content quote -- escape it.
-                    result.append('\\')
-                    result.append(c)
-            else:
-                result.append(c)
-
-        i += 1
-
-    return ''.join(result)
-
-
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: fix_json_quotes.py <input.json> [output.json]", file=sys.stderr)
-        sys.exit(1)
-
-    input_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else input_file
-
-    with open(input_file, 'r', encoding='utf-8') as f:
-        original = f.read()
-
-    fixed = fix_json_quotes(original)
-
-    # Validate the result.
-    try:
-        data = json.loads(fixed)
-        chapters = data.get('chapters', data.get('citations', []))
-        print("OK  JSON valid after fix (%d top-level items)" % len(chapters))
-    except json.JSONDecodeError as e:
-        print("ERR Still invalid after fix: %s" % e, file=sys.stderr)
-        # Print context around the error for debugging.
-        lines = fixed.split('\n')
-        err_line = e.lineno - 1
-        for idx in range(max(0, err_line - 1), min(len(lines), err_line + 2)):
-            print("  L%d: %s" % (idx + 1, lines[idx][:120]), file=sys.stderr)
-        sys.exit(1)
-
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(fixed)
-
-    if output_file == input_file:
-        print("    Fixed in-place: %s" % output_file)
-    else:
-        print("    Written to: %s" % output_file)
-
-
-if __name__ == '__main__':
-    main()
+#!/usr/bin/env python3
+"""
+fix_json_quotes.py -- Auto-fix unescaped double quotes inside JSON string values.
+
+Problem: The Write tool converts Chinese typographic quotes "..." (U+201C/U+201D)
+to ASCII double quotes ", breaking JSON validity when those quotes appear inside
+string values.
+
+Solution: A state-machine parser that identifies whether each " is a structural
+JSON delimiter or an inner content quote, and escapes the latter.
+
+Usage:
+    python3 fix_json_quotes.py <input.json>               # fix in-place
+    python3 fix_json_quotes.py <input.json> <output.json> # write to separate file
+    python3 fix_json_quotes.py <input.json> [output.json] --stream
+                                                          # chunked, for very large files
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import tempfile
+
+# Characters that need a decision: a quote (open / close / escape) or a
+# backslash (passes the next character through untouched).
+_SPECIAL_RE = re.compile(r'["\\]')
+_BLANK_RE = re.compile(r'[ \t]*')
+
+# Valid JSON post-string tokens (ASCII only):
+# ,  next element in object/array
+# }  end of object
+# ]  end of array
+# :  key-value separator (after a key string)
+# \n \r  end of line (common in pretty-printed JSON)
+# '' end of input
+_CLOSERS = frozenset(',}]:\n\r') | {''}
+
+CHUNK_SIZE = 1 << 20
+
+
+class _QuoteFixer:
+    """Incremental form of the quote-repair state machine.
+
+    feed() jumps between quote/backslash characters with a regex instead of
+    walking every character.  A decision that needs look-ahead past the end of
+    the current chunk (a backslash, or an in-string quote followed only by
+    blanks) is deferred: the undecided tail is carried into the next feed().
+
+    Outside strings the fixer also keeps a bracket balance so that streaming
+    mode can sanity-check the result without loading it.
+    """
+
+    def __init__(self):
+        self.in_string = False
+        self.depth = 0
+        self._carry = ''
+
+    def _structure(self, segment):
+        self.depth += (segment.count('{') + segment.count('[')
+                       - segment.count('}') - segment.count(']'))
+
+    def feed(self, chunk, final=False):
+        text = self._carry + chunk if self._carry else chunk
+        n = len(text)
+        out = []
+        pos = 0
+        while True:
+            m = _SPECIAL_RE.search(text, pos)
+            if m is None:
+                if not self.in_string:
+                    self._structure(text[pos:])
+                out.append(text[pos:])
+                pos = n
+                break
+            k = m.start()
+
+            if text[k] == '\\':
+                # Already escaped: pass the backslash and the next char through.
+                if k + 1 >= n and not final:
+                    if not self.in_string:
+                        self._structure(text[pos:k])
+                    out.append(text[pos:k])
+                    pos = k
+                    break
+                if not self.in_string:
+                    self._structure(text[pos:k])
+                out.append(text[pos:k + 2])
+                pos = k + 2
+                continue
+
+            if not self.in_string:
+                # Outside a string: a quote always opens one.
+                self._structure(text[pos:k])
+                self.in_string = True
+                out.append(text[pos:k + 1])
+                pos = k + 1
+                continue
+
+            # Inside a string: the quote closes it only if the next
+            # non-blank character is a post-string token.
+            j = _BLANK_RE.match(text, k + 1).end()
+            if j >= n and not final:
+                out.append(text[pos:k])
+                pos = k
+                break
+            if text[j:j + 1] in _CLOSERS:
+                self.in_string = False
+                out.append(text[pos:k + 1])
+            else:
+                # Inner content quote -- escape it.
+                out.append(text[pos:k])
+                out.append('\\"')
+            pos = k + 1
+
+        self._carry = text[pos:]
+        return ''.join(out)
+
+    def finish(self):
+        return self.feed('', final=True)
+
+
+def _repair(text):
+    """Return (fixed_text, parsed_or_None).
+
+    Valid JSON is returned unchanged with its parsed value: in valid JSON every
+    closing quote is followed by a post-string token, so the state machine
+    would reproduce the input exactly and the scan can be skipped.
+    """
+    try:
+        return text, json.loads(text)
+    except (ValueError, RecursionError):
+        pass
+    return _QuoteFixer().feed(text, final=True), None
+
+
+def fix_json_quotes(text):
+    """Fix unescaped double quotes inside JSON string values.
+
+    Within a string, a " is treated as the *end* of the string only when the
+    next non-whitespace character is one of the valid JSON post-string tokens:
+    , } ] : newline.  Otherwise the " is treated as inner content and escaped
+    with backslash.
+    """
+    return _repair(text)[0]
+
+
+def fix_json_quotes_stream(src, dst, chunk_size=CHUNK_SIZE):
+    """Repair text from file object src into dst chunk by chunk.
+
+    Returns the fixer so callers can inspect its final state (in_string, depth).
+    """
+    fixer = _QuoteFixer()
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        dst.write(fixer.feed(chunk))
+    dst.write(fixer.finish())
+    return fixer
+
+
+def _main_stream(input_file, output_file):
+    out_dir = os.path.dirname(os.path.abspath(output_file))
+    fd, tmp_path = tempfile.mkstemp(suffix='.json', dir=out_dir)
+    try:
+        with open(input_file, 'r', encoding='utf-8') as src, \
+                os.fdopen(fd, 'w', encoding='utf-8') as dst:
+            fixer = fix_json_quotes_stream(src, dst)
+
+        # A full parse would defeat streaming; check what the scan can see.
+        if fixer.in_string or fixer.depth != 0:
+            reason = 'unterminated string' if fixer.in_string else \
+                'unbalanced brackets (depth %+d)' % fixer.depth
+            print("ERR Still invalid after fix: %s" % reason, file=sys.stderr)
+            os.unlink(tmp_path)
+            sys.exit(1)
+        size = os.path.getsize(tmp_path)
+        if os.path.exists(output_file):
+            shutil.copymode(output_file, tmp_path)
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    print("OK  JSON structure balanced after fix (stream mode, %d bytes)" % size)
+    if output_file == input_file:
+        print("    Fixed in-place: %s" % output_file)
+    else:
+        print("    Written to: %s" % output_file)
+
+
+def main():
+    stream = '--stream' in sys.argv[1:]
+    args = [a for a in sys.argv[1:] if a != '--stream']
+    if len(args) < 1:
+        print("Usage: fix_json_quotes.py <input.json> [output.json] [--stream]", file=sys.stderr)
+        sys.exit(1)
+
+    input_file = args[0]
+    output_file = args[1] if len(args) > 1 else input_file
+
+    if stream:
+        _main_stream(input_file, output_file)
+        return
+
+    with open(input_file, 'r', encoding='utf-8') as f:
+        original = f.read()
+
+    fixed, data = _repair(original)
+
+    # Validate the result.
+    try:
+        if data is None:
+            data = json.loads(fixed)
+        chapters = data.get('chapters', data.get('citations', []))
+        print("OK  JSON valid after fix (%d top-level items)" % len(chapters))
+    except json.JSONDecodeError as e:
+        print("ERR Still invalid after fix: %s" % e, file=sys.stderr)
+        # Print context around the error for debugging.
+        lines = fixed.split('\n')
+        err_line = e.lineno - 1
+        for idx in range(max(0, err_line - 1), min(len(lines), err_line + 2)):
+            print("  L%d: %s" % (idx + 1, lines[idx][:120]), file=sys.stderr)
+        sys.exit(1)
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(fixed)
+
+    if output_file == input_file:
+        print("    Fixed in-place: %s" % output_file)
+    else:
+        print("    Written to: %s" % output_file)
+
+
+if __name__ == '__main__':
+    main()
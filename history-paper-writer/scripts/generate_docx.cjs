@@ -1,11 +1,12 @@
 #!/usr/bin/env node
 
+const crypto = require('crypto');
 const fs = require('fs');
 const { Document, Packer, Paragraph, TextRun, AlignmentType, HeadingLevel, convertInchesToTwip, Footer, Header, PageNumber } = require('docx');
 
 function parseArgs() {
   const args = process.argv.slice(2);
-  const result = { input: null, output: null };
+  const result = { input: null, output: null, footnoteIndex: null };
   for (let i = 0; i < args.length; i++) {
     if (args[i] === '--input' && i + 1 < args.length) {
       result.input = args[i + 1];
@@ -13,10 +14,13 @@ function parseArgs() {
     } else if (args[i] === '--output' && i + 1 < args.length) {
       result.output = args[i + 1];
       i++;
+    } else if (args[i] === '--footnote-index' && i + 1 < args.length) {
+      result.footnoteIndex = args[i + 1];
+      i++;
     }
   }
   if (!result.input || !result.output) {
-    console.error('Usage: node generate_docx.js --input <json> --output <docx>');
+    console.error('Usage: node generate_docx.js --input <json> --output <docx> [--footnote-index <json>]');
     process.exit(1);
   }
   return result;
@@ -32,6 +36,57 @@ function loadPaperContent(inputPath) {
   }
 }
 
+const CIRCLED_NUMBER = /^[①-⑳]$/;
+
+function contentHash(text) {
+  return crypto.createHash('sha256').update(text, 'utf8').digest('hex');
+}
+
+// An index entry is only trusted when the chapter text is byte-for-byte the one
+// that was indexed and every marker offset still lands on a circled number.
+function chapterIndexMatches(entry, chapter) {
+  return entry.content_length === chapter.content.length &&
+    entry.footnote_count === chapter.footnotes.length &&
+    entry.content_sha256 === contentHash(chapter.content) &&
+    Array.isArray(entry.markers) &&
+    entry.markers.every((m) => CIRCLED_NUMBER.test(chapter.content.charAt(m.offset)));
+}
+
+// Load the marker index written by index_footnotes.py. Returns null (legacy
+// scanning) when the index does not describe this paper's chapters.
+function loadFootnoteIndex(indexPath, paper) {
+  let index;
+  try {
+    index = JSON.parse(fs.readFileSync(indexPath, 'utf8'));
+  } catch (err) {
+    console.error(`Failed to load footnote index: ${err.message}`);
+    process.exit(1);
+  }
+  const stale = index.version !== 2 ||
+    !Array.isArray(index.chapters) ||
+    index.chapters.length !== paper.chapters.length ||
+    index.chapters.some((entry, i) => !chapterIndexMatches(entry, paper.chapters[i]));
+  if (stale) {
+    console.warn('Footnote index does not match input, falling back to marker scan (re-run index_footnotes.py)');
+    return null;
+  }
+  return index;
+}
+
+// Legacy marker detection: circled numbers paired with footnotes by position,
+// extra markers reuse the last footnote.
+function scanFootnoteMarkers(chapter) {
+  const circledNumberPattern = /[①②③④⑤⑥⑦⑧⑨⑩⑪⑫⑬⑭⑮⑯⑰⑱⑲⑳]/g;
+  const markers = [];
+  let i = 0;
+  for (const match of chapter.content.matchAll(circledNumberPattern)) {
+    const footnote = i < chapter.footnotes.length ? i : chapter.footnotes.length - 1;
+    markers.push({ offset: match.index, length: 1, footnote: footnote >= 0 ? footnote : null });
+    i++;
+  }
+  return markers;
+}
+
 function createCoverPage(paper) {
   return [
     new Paragraph({
@@ -150,12 +205,13 @@ function createAbstractEN(paper) {
   ];
 }
 
-function createBodyChapters(paper) {
+function createBodyChapters(paper, footnoteIndex = null) {
   const elements = [];
   let footnoteCounter = 1;
   const allFootnotes = [];
 
-  for (const chapter of paper.chapters) {
+  for (let chapterNo = 0; chapterNo < paper.chapters.length; chapterNo++) {
+    const chapter = paper.chapters[chapterNo];
     // Chapter title
     elements.push(
       new Paragraph({
@@ -172,13 +228,14 @@ function createBodyChapters(paper) {
       })
     );
 
-    // Process chapter content - split by footnote markers (①②③ etc)
+    // Process chapter content - split by footnote markers (①②③ etc),
+    // taken from the precomputed index when available
     const contentParts = [];
-    let currentText = '';
-    const circledNumberPattern = /[①②③④⑤⑥⑦⑧⑨⑩⑪⑫⑬⑭⑮⑯⑰⑱⑲⑳]/g;
-    const matches = [...chapter.content.matchAll(circledNumberPattern)];
+    const markers = footnoteIndex
+      ? footnoteIndex.chapters[chapterNo].markers
+      : scanFootnoteMarkers(chapter);
     
-    if (matches.length === 0) {
+    if (markers.length === 0) {
       // No footnotes in this chapter
       contentParts.push(new TextRun({
         text: chapter.content,
@@ -187,9 +244,8 @@ function createBodyChapters(paper) {
       }));
     } else {
       let lastIndex = 0;
-      for (let i = 0; i < matches.length; i++) {
-        const match = matches[i];
-        const matchIndex = match.index;
+      for (const marker of markers) {
+        const matchIndex = marker.offset;
         
         // Add text before footnote marker
         if (matchIndex > lastIndex) {
@@ -201,9 +257,8 @@ function createBodyChapters(paper) {
         }
         
         // Add footnote reference (use superscript for now, post-processing will handle circled numbers)
-        const footnoteIndex = i < chapter.footnotes.length ? i : chapter.footnotes.length - 1;
-        if (footnoteIndex >= 0 && footnoteIndex < chapter.footnotes.length) {
-          const footnote = chapter.footnotes[footnoteIndex];
+        if (marker.footnote !== null && marker.footnote < chapter.footnotes.length) {
+          const footnote = chapter.footnotes[marker.footnote];
           allFootnotes.push(footnote);
           
           // Use placeholder text with superscript (will be post-processed to circled numbers)
@@ -216,7 +271,7 @@ function createBodyChapters(paper) {
           footnoteCounter++;
         }
         
-        lastIndex = matchIndex + 1;
+        lastIndex = matchIndex + marker.length;
       }
       
       // Add remaining text
@@ -317,8 +372,9 @@ function createReferences(paper) {
   return elements;
 }
 
-async function generateDocx(inputPath, outputPath) {
+async function generateDocx(inputPath, outputPath, footnoteIndexPath = null) {
   const paper = loadPaperContent(inputPath);
+  const footnoteIndex = footnoteIndexPath ? loadFootnoteIndex(footnoteIndexPath, paper) : null;
   
   const doc = new Document({
     sections: [
@@ -349,7 +405,7 @@ async function generateDocx(inputPath, outputPath) {
           ...createCoverPage(paper),
           ...createAbstractCN(paper),
           ...createAbstractEN(paper),
-          ...createBodyChapters(paper),
+          ...createBodyChapters(paper, footnoteIndex),
           ...createReferences(paper)
         ]
       }
@@ -365,7 +421,7 @@ async function generateDocx(inputPath, outputPath) {
 
 if (require.main === module) {
   const args = parseArgs();
-  generateDocx(args.input, args.output)
+  generateDocx(args.input, args.output, args.footnoteIndex)
     .then(() => {
       console.log('DOCX generation completed successfully');
       process.exit(0);
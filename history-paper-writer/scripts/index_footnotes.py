@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+index_footnotes.py - 预先建立「正文脚注标记 → 脚注」索引
+
+generate_docx.cjs 原先在渲染时逐章用正则重扫圈号①–⑳，按出现顺序对应
+chapter.footnotes，标记多于脚注时一律落到最后一条，错配不报错。
+本脚本在 fix_json_quotes.py 之后运行：读入论文 JSON 一次，逐章扫描圈号，
+写出显式的标记位置与脚注下标，供 generate_docx.cjs --footnote-index 直接使用；
+标记与脚注对不上时在生成 DOCX 之前报告。
+
+配对规则：
+- 本章脚注都带整数 index 时，圈号 ⓝ 对应 index == n 的脚注
+- 否则按出现顺序，第 k 个圈号对应 footnotes[k]
+
+位置以 UTF-16 码元计（与 JavaScript 字符串下标一致），扩展区汉字不会造成错位。
+每章另记正文的 SHA-256，generate_docx.cjs 据此发现索引生成后又改过的章节（长度不变的改动也能发现）。
+
+Usage:
+    python3 index_footnotes.py paper_content.json                   # 写出 paper_content.footnote_index.json
+    python3 index_footnotes.py paper_content.json index.json
+"""
+
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+INDEX_VERSION = 2
+
+_CIRCLED_RE = re.compile(r"[①-⑳]")
+_CIRCLED_BASE = 0x2460 - 1
+
+
+def _utf16_len(text):
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _content_hash(text):
+    # 与 Node 的 createHash('sha256').update(text, 'utf8') 一致；孤立代理项两边编码不同，
+    # 只会导致 generate_docx.cjs 判为过期并退回扫描
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _footnote_lookup(footnotes):
+    """返回 圈号数值 → 脚注下标 的映射；脚注未全部带整数 index 时返回 None（按顺序配对）。"""
+    lookup = {}
+    for pos, footnote in enumerate(footnotes):
+        index = footnote.get("index") if isinstance(footnote, dict) else None
+        if not isinstance(index, int) or isinstance(index, bool) or index in lookup:
+            return None
+        lookup[index] = pos
+    return lookup
+
+
+def index_chapter(chapter, chapter_no):
+    """扫描一章正文，返回 (索引条目, 问题列表)。"""
+    content = chapter.get("content", "")
+    footnotes = chapter.get("footnotes", [])
+    lookup = _footnote_lookup(footnotes)
+
+    markers = []
+    problems = []
+    used = {}
+    offset = 0
+    last = 0
+    for k, m in enumerate(_CIRCLED_RE.finditer(content)):
+        # 逐段累加 UTF-16 长度，整章只编码一遍
+        offset += _utf16_len(content[last:m.start()])
+        last = m.start()
+        number = ord(m.group()) - _CIRCLED_BASE
+        if lookup is None:
+            target = k if k < len(footnotes) else None
+        else:
+            target = lookup.get(number)
+
+        if target is None:
+            problems.append({
+                "type": "MARKER_WITHOUT_FOOTNOTE",
+                "chapter": chapter_no,
+                "marker": m.group(),
+                "offset": offset,
+            })
+        elif target in used:
+            problems.append({
+                "type": "FOOTNOTE_REUSED",
+                "chapter": chapter_no,
+                "marker": m.group(),
+                "offset": offset,
+                "footnote": target,
+                "first_offset": used[target],
+            })
+        else:
+            used[target] = offset
+        markers.append({"offset": offset, "length": 1, "footnote": target})
+
+    for pos in range(len(footnotes)):
+        if pos not in used:
+            problems.append({"type": "FOOTNOTE_UNREFERENCED", "chapter": chapter_no, "footnote": pos})
+
+    entry = {
+        "content_length": offset + _utf16_len(content[last:]),
+        "content_sha256": _content_hash(content),
+        "footnote_count": len(footnotes),
+        "markers": markers,
+    }
+    return entry, problems
+
+
+def build_index(paper):
+    """为整篇论文建立脚注索引；返回 (索引, 问题列表)。"""
+    chapters = []
+    problems = []
+    for no, chapter in enumerate(paper.get("chapters", []), 1):
+        entry, chapter_problems = index_chapter(chapter, no)
+        chapters.append(entry)
+        problems.extend(chapter_problems)
+
+    index = {
+        "version": INDEX_VERSION,
+        "marker_count": sum(len(c["markers"]) for c in chapters),
+        "footnote_count": sum(c["footnote_count"] for c in chapters),
+        "chapters": chapters,
+        "problems": problems,
+    }
+    return index, problems
+
+
+def _describe(problem):
+    where = "第%d章" % problem["chapter"]
+    if problem["type"] == "MARKER_WITHOUT_FOOTNOTE":
+        return "%s 位置 %d 的标记 %s 找不到对应脚注" % (where, problem["offset"], problem["marker"])
+    if problem["type"] == "FOOTNOTE_REUSED":
+        return "%s 位置 %d 的标记 %s 与位置 %d 指向同一条脚注 footnotes[%d]" % (
+            where, problem["offset"], problem["marker"], problem["first_offset"], problem["footnote"])
+    return "%s footnotes[%d] 没有被任何标记引用" % (where, problem["footnote"])
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: index_footnotes.py <paper.json> [index.json]", file=sys.stderr)
+        sys.exit(1)
+
+    input_path = Path(sys.argv[1])
+    output_path = Path(sys.argv[2]) if len(sys.argv) > 2 else \
+        input_path.with_name(input_path.stem + ".footnote_index.json")
+
+    try:
+        with open(input_path, "r", encoding="utf-8") as f:
+            paper = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print("ERR Cannot read %s: %s" % (input_path, e), file=sys.stderr)
+        sys.exit(1)
+
+    index, problems = build_index(paper)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+
+    print("%s %d 章  %d 个标记  %d 条脚注" % (
+        "ERR" if problems else "OK ", len(index["chapters"]),
+        index["marker_count"], index["footnote_count"]))
+    print("    Index written to: %s" % output_path)
+    for problem in problems:
+        print("    - " + _describe(problem), file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
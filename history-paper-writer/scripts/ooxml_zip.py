@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+ooxml_zip.py - DOCX（OOXML zip 包）读写辅助
+
+zipfile 没有公开的「原样拷贝压缩数据」接口，这里用一个最小的 zip 写入器补上：
+- copy_docx()：按原顺序复制成员，被替换的成员重新压缩，其余成员的压缩数据
+  直接搬运（不解压、不重压）
+- ZipWriter：写入已压缩的原始数据或现场压缩的数据，时间戳由调用方指定
+
+只写普通 zip（不含 zip64、加密、数据描述符）；超出范围时 needs_zipfile_fallback()
+返回 True，调用方改用 zipfile 逐个重压。
+"""
+
+import struct
+import zipfile
+import zlib
+from typing import BinaryIO, Dict, List, Tuple
+
+# zip 能表示的最早时间；确定性打包统一使用
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+_LOCAL = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL = struct.Struct("<IHHHHHHIIIHHHHHII")
+_EOCD = struct.Struct("<IHHHHIIH")
+_LOCAL_SIG = 0x04034B50
+_CENTRAL_SIG = 0x02014B50
+_EOCD_SIG = 0x06054B50
+
+_VERSION = 20
+_FLAG_ENCRYPTED = 0x01
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_LIMIT = 0xFFFFFFFF
+
+
+def _dos_datetime(date_time: Tuple[int, int, int, int, int, int]) -> Tuple[int, int]:
+    y, mo, d, h, mi, s = date_time
+    return (h << 11) | (mi << 5) | (s // 2), ((y - 1980) << 9) | (mo << 5) | d
+
+
+def compress(payload: bytes, level: int = 6, store: bool = False) -> Tuple[int, bytes]:
+    """返回 (压缩方式, 压缩后数据)；level 0 或 store 时存储不压缩。"""
+    if store or level == 0:
+        return zipfile.ZIP_STORED, payload
+    co = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return zipfile.ZIP_DEFLATED, co.compress(payload) + co.flush()
+
+
+class ZipWriter:
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        self._central: List[bytes] = []
+
+    def add_raw(self, name: str, data: bytes, method: int, crc: int, file_size: int,
+                date_time=FIXED_DATE_TIME, external_attr: int = 0o644 << 16,
+                create_system: int = 3) -> None:
+        """写入一个成员；data 为已按 method 压缩好的字节。
+
+        external_attr 按 create_system（3 = Unix，0 = DOS/Windows）解释，
+        拷贝成员时两者须一并取自源条目。
+        """
+        offset = self._f.tell()
+        if offset > _LIMIT or len(data) > _LIMIT or file_size > _LIMIT:
+            raise OverflowError(f"{name}: 超出非 zip64 格式的大小上限")
+        encoded = name.encode("utf-8")
+        flags = 0 if name.isascii() else _FLAG_UTF8
+        dos_time, dos_date = _dos_datetime(date_time)
+        self._f.write(_LOCAL.pack(
+            _LOCAL_SIG, _VERSION, flags, method, dos_time, dos_date,
+            crc, len(data), file_size, len(encoded), 0))
+        self._f.write(encoded)
+        self._f.write(data)
+        self._central.append(_CENTRAL.pack(
+            _CENTRAL_SIG, (create_system << 8) | _VERSION, _VERSION, flags, method, dos_time, dos_date,
+            crc, len(data), file_size, len(encoded), 0, 0, 0, 0, external_attr, offset) + encoded)
+
+    def add(self, name: str, payload: bytes, level: int = 6, store: bool = False,
+            date_time=FIXED_DATE_TIME) -> None:
+        method, data = compress(payload, level, store)
+        self.add_raw(name, data, method, zlib.crc32(payload), len(payload), date_time)
+
+    def close(self) -> None:
+        if len(self._central) >= 0xFFFF:
+            raise OverflowError("成员数超出非 zip64 格式上限")
+        start = self._f.tell()
+        for entry in self._central:
+            self._f.write(entry)
+        size = self._f.tell() - start
+        self._f.write(_EOCD.pack(_EOCD_SIG, 0, 0, len(self._central), len(self._central),
+                                 size, start, 0))
+
+
+def read_raw(fp: BinaryIO, info: zipfile.ZipInfo) -> bytes:
+    """读取成员的压缩数据（跳过本地文件头，不解压）。"""
+    fp.seek(info.header_offset)
+    header = fp.read(_LOCAL.size)
+    if len(header) != _LOCAL.size or _LOCAL.unpack(header)[0] != _LOCAL_SIG:
+        raise zipfile.BadZipFile(f"{info.filename}: 本地文件头损坏")
+    name_len, extra_len = _LOCAL.unpack(header)[9:11]
+    fp.seek(info.header_offset + _LOCAL.size + name_len + extra_len)
+    return fp.read(info.compress_size)
+
+
+def needs_zipfile_fallback(infos: List[zipfile.ZipInfo]) -> bool:
+    """加密、zip64 或非 stored/deflate 成员无法原样搬运。"""
+    if len(infos) >= 0xFFFF:
+        return True
+    for info in infos:
+        if info.flag_bits & _FLAG_ENCRYPTED:
+            return True
+        if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            return True
+        if max(info.file_size, info.compress_size, info.header_offset) >= _LIMIT:
+            return True
+    return False
+
+
+def copy_docx(src_path, dst: BinaryIO, replacements: Dict[str, bytes], level: int = 6) -> None:
+    """把 src_path 复制到 dst：replacements 中的成员换成新内容并压缩，其余成员压缩数据原样拷贝。
+
+    成员顺序、时间戳、外部属性及其所属系统（made-by）保持原样；数据描述符标志被清除（大小与 CRC 已写入本地头）。
+    """
+    with zipfile.ZipFile(src_path) as zin:
+        infos = zin.infolist()
+        if needs_zipfile_fallback(infos):
+            _copy_with_zipfile(zin, infos, dst, replacements)
+            return
+        writer = ZipWriter(dst)
+        with open(src_path, "rb") as raw:
+            for info in infos:
+                if info.filename in replacements:
+                    payload = replacements[info.filename]
+                    method, data = compress(payload, level)
+                    writer.add_raw(info.filename, data, method, zlib.crc32(payload),
+                                   len(payload), info.date_time, info.external_attr,
+                                   info.create_system)
+                else:
+                    writer.add_raw(info.filename, read_raw(raw, info), info.compress_type,
+                                   info.CRC, info.file_size, info.date_time, info.external_attr,
+                                   info.create_system)
+        writer.close()
+
+
+def _copy_with_zipfile(zin: zipfile.ZipFile, infos: List[zipfile.ZipInfo], dst: BinaryIO,
+                       replacements: Dict[str, bytes]) -> None:
+    with zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zout:
+        for info in infos:
+            payload = replacements.get(info.filename)
+            if payload is None:
+                payload = zin.read(info)
+            zout.writestr(info, payload, compress_type=zipfile.ZIP_DEFLATED)
@@ -3,28 +3,126 @@
 Simple pack script for Python 3.9 compatibility
 
 Creates a .docx file from an unpacked directory without validation.
+
+Output is deterministic: [Content_Types].xml comes first, the remaining members
+follow in sorted path order, and every member carries the same fixed timestamp
+and attributes, so identical input trees produce byte-identical files.
+
+Usage:
+    python pack_simple.py <input_directory> <output_file>
+    python pack_simple.py <input_directory> <output_file> --level 9 --jobs 4
+    python pack_simple.py <input_directory> <output_file> --store
 """
 
+import argparse
+import os
 import sys
 import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-if len(sys.argv) != 3:
-    print("Usage: pack_simple.py <input_directory> <output_file>")
-    sys.exit(1)
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ooxml_zip import FIXED_DATE_TIME, ZipWriter, compress
+
+CONTENT_TYPES = "[Content_Types].xml"
+
+# Members at least this large are deflated on the thread pool (zlib releases the GIL)
+PARALLEL_THRESHOLD = 256 * 1024
+
+
+def collect_members(input_dir):
+    """Return (archive name, path) pairs in deterministic order."""
+    members = [
+        (f.relative_to(input_dir).as_posix(), f)
+        for f in input_dir.rglob("*") if f.is_file()
+    ]
+    members.sort(key=lambda m: (m[0] != CONTENT_TYPES, m[0]))
+    return members
+
+
+def _load(path, level, store):
+    payload = path.read_bytes()
+    method, data = compress(payload, level, store)
+    return method, data, zlib.crc32(payload), len(payload)
+
+
+def pack(input_dir, output_file, level=6, store=False, jobs=1):
+    members = collect_members(input_dir)
+    total = sum(path.stat().st_size for _, path in members)
+    if total >= 0xFFFFFFFF or len(members) >= 0xFFFF:
+        _pack_with_zipfile(members, output_file, level, store)
+        return
+
+    with open(output_file, "wb") as out, \
+            ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        writer = ZipWriter(out)
+        # Large members are deflated ahead of the writer, but at most `window` of them
+        # are in flight at once so compressed payloads never pile up in memory.
+        window = 2 * max(1, jobs)
+        queue = deque()
+        in_flight = 0
+        upcoming = iter(members)
+        while True:
+            while in_flight < window:
+                member = next(upcoming, None)
+                if member is None:
+                    break
+                name, path = member
+                future = None
+                if jobs > 1 and path.stat().st_size >= PARALLEL_THRESHOLD:
+                    future = pool.submit(_load, path, level, store)
+                    in_flight += 1
+                queue.append((name, path, future))
+            if not queue:
+                break
+            name, path, future = queue.popleft()
+            if future is not None:
+                method, data, crc, size = future.result()
+                in_flight -= 1
+            else:
+                method, data, crc, size = _load(path, level, store)
+            writer.add_raw(name, data, method, crc, size, FIXED_DATE_TIME)
+        writer.close()
+
+
+def _pack_with_zipfile(members, output_file, level, store):
+    """zip64 fallback for very large trees; same order and timestamps."""
+    method = zipfile.ZIP_STORED if store or level == 0 else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(output_file, "w", method, allowZip64=True) as zf:
+        for name, path in members:
+            info = zipfile.ZipInfo(name, FIXED_DATE_TIME)
+            info.external_attr = 0o644 << 16
+            zf.writestr(info, path.read_bytes(), compress_type=method,
+                        compresslevel=None if method == zipfile.ZIP_STORED else level)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack an unpacked OOXML directory into a .docx")
+    parser.add_argument("input_directory")
+    parser.add_argument("output_file")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--level", type=int, default=6, choices=range(0, 10), metavar="0-9",
+                       help="deflate level (default 6; 0 = store)")
+    group.add_argument("--store", action="store_true", help="store members without compression")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="threads for deflating members >= 256 KiB (default: CPU count)")
+    args = parser.parse_args()
+
+    input_dir = Path(args.input_directory)
+    output_file = Path(args.output_file)
 
-input_dir = Path(sys.argv[1])
-output_file = Path(sys.argv[2])
+    if not input_dir.is_dir():
+        print(f"Error: {input_dir} is not a directory")
+        sys.exit(1)
 
-if not input_dir.is_dir():
-    print(f"Error: {input_dir} is not a directory")
-    sys.exit(1)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    pack(input_dir, output_file, args.level, args.store, args.jobs)
 
-output_file.parent.mkdir(parents=True, exist_ok=True)
+    print(f"✅ Packed {output_file}")
 
-with zipfile.ZipFile(output_file, "w", zipfile.ZIP_DEFLATED) as zf:
-    for f in input_dir.rglob("*"):
-        if f.is_file():
-            zf.write(f, f.relative_to(input_dir))
 
-print(f"✅ Packed {output_file}")
+if __name__ == "__main__":
+    main()
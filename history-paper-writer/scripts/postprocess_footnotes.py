@@ -8,8 +8,11 @@ Injects footnote properties into unpacked DOCX XML:
 
 Usage:
     python postprocess_footnotes.py --dir <unpacked-docx-dir>
+
+For a packed .docx use finalize_docx.py, which applies the same patch in memory.
 """
 
+import io
 import sys
 import xml.etree.ElementTree as ET
 from pathlib import Path
@@ -18,13 +21,13 @@ from pathlib import Path
 WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
 
 
-def inject_footnote_properties(settings_path):
-    """Modify word/settings.xml to add footnote properties"""
+def patch_settings_xml(data):
+    """Return word/settings.xml bytes with the footnote properties added"""
     ET.register_namespace(
         "w", "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
     )
 
-    tree = ET.parse(settings_path)
+    tree = ET.ElementTree(ET.fromstring(data))
     root = tree.getroot()
 
     # Check if footnotePr already exists
@@ -46,8 +49,16 @@ def inject_footnote_properties(settings_path):
         num_fmt = ET.SubElement(footnote_pr, f"{WORD_NS}numFmt")
     num_fmt.set(f"{WORD_NS}val", "decimalEnclosedCircle")
 
-    # Write back with XML declaration
-    tree.write(settings_path, encoding="utf-8", xml_declaration=True)
+    # Serialize with XML declaration
+    buf = io.BytesIO()
+    tree.write(buf, encoding="utf-8", xml_declaration=True)
+    return buf.getvalue()
+
+
+def inject_footnote_properties(settings_path):
+    """Modify word/settings.xml to add footnote properties"""
+    settings_path = Path(settings_path)
+    settings_path.write_bytes(patch_settings_xml(settings_path.read_bytes()))
     print(f"✅ Injected footnote properties into {settings_path}")
 
 
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+snippet_dedup.py - 引文片段重复 / 近似重复检测（MinHash + LSH）
+
+供 citation_audit.py 调用，找出两类可疑引注：
+1. 同一段 quote_snippet 被用来支撑多条不同的 claim
+2. 几乎相同的片段却标注了不同的 page_locator
+
+做法：
+- 片段规范化（NFKC、去掉一切非字母数字字符、小写）后取字符 3-gram；规范化后为空的片段
+  （全是标点 / 符号）不参与聚类
+- 单次哈希 MinHash（one permutation hashing）：每个 gram 只哈希一次，按哈希低 5 位分入
+  SIG_BINS 个桶，各桶取最小值的 16 位作签名；空桶向右借用最近非空桶的值
+- LSH：签名切成 BANDS 段，每段 64 位直接作键；逐段排序，同键的片段与该组首个片段比较
+  签名相似度，达到阈值即用并查集合并成簇
+
+每条引注只保存 64 字节签名与三个 32 位摘要，不保存片段原文；
+排序 + 与组首比较使总耗时近似线性，不做两两比较。
+"""
+
+import operator
+import re
+import unicodedata
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+SIG_BINS = 32
+BANDS = 8
+ROWS = SIG_BINS // BANDS  # 4 × 16 位 = 64 位
+NGRAM = 3
+DEFAULT_THRESHOLD = 0.8
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def normalize(text: str) -> str:
+    """NFKC 规范化后去掉全部非字母数字字符（\\W 与下划线），并转小写。
+
+    比 source_index.normalize（只去空白与 Unicode 标点）去得更多：￥、→ 等符号也去掉。
+    """
+    text = _NON_WORD_RE.sub("", text)
+    if not unicodedata.is_normalized("NFKC", text):
+        # 多数片段去标点后已是 NFKC（全角字母数字等除外），跳过代价较高的 normalize
+        text = _NON_WORD_RE.sub("", unicodedata.normalize("NFKC", text))
+    return text.lower()
+
+
+def _digest(text: str) -> int:
+    # 摘要只在同一簇内比较，32 位足够
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def snippet_signature(text: str) -> bytes:
+    """返回 SIG_BINS 个 16 位槽位组成的签名（小端字节串）；两签名同位相等的比例估计 Jaccard 相似度。"""
+    return _signature(normalize(text))
+
+
+def _signature(norm: str) -> bytes:
+    if len(norm) < NGRAM:
+        grams = {norm}
+    else:
+        grams = {norm[i:i + NGRAM] for i in range(len(norm) - NGRAM + 1)}
+
+    # crc32 跨进程稳定（内置 hash() 受 PYTHONHASHSEED 影响，不能用于进程池）；
+    # 低 5 位定桶，降序写入使每桶最终保留最小值
+    hashes = sorted(map(zlib.crc32, map(str.encode, grams)), reverse=True)
+    mins = [-1] * SIG_BINS
+    for h in hashes:
+        mins[h & (SIG_BINS - 1)] = h
+
+    slots = [h >> 16 for h in mins]
+    if -1 in mins:
+        for b in range(SIG_BINS):
+            if mins[b] >= 0:
+                continue
+            # 空桶：借用右侧最近的非空桶，并混入距离以免相邻空桶取值全同
+            shift = 1
+            while mins[(b + shift) % SIG_BINS] < 0:
+                shift += 1
+            slots[b] = ((mins[(b + shift) % SIG_BINS] >> 16) ^ (shift * 0x9E37)) & 0xFFFF
+    return array("H", slots).tobytes()
+
+
+def signature_similarity(a: bytes, b: bytes) -> float:
+    return sum(map(operator.eq, array("H", a), array("H", b))) / SIG_BINS
+
+
+class SnippetDeduper:
+    """按引注顺序累积签名，finish() 时一次性做 LSH 聚类。"""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._index = array("I")
+        self._sigs = bytearray()
+        self._snippet = array("I")
+        self._claim = array("I")
+        self._page = array("I")
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def add(self, idx: int, signature: bytes, snippet_digest: int,
+            claim_digest: int, page_digest: int) -> None:
+        self._index.append(idx)
+        self._sigs += signature
+        self._snippet.append(snippet_digest)
+        self._claim.append(claim_digest)
+        self._page.append(page_digest)
+
+    def _sig(self, pos: int) -> bytes:
+        width = 2 * SIG_BINS
+        return bytes(self._sigs[pos * width:(pos + 1) * width])
+
+    def _similarity(self, i: int, j: int) -> float:
+        if self._snippet[i] == self._snippet[j]:
+            return 1.0
+        return signature_similarity(self._sig(i), self._sig(j))
+
+    def finish(self) -> List[Dict]:
+        """返回全部重复簇（至少两条引注），按簇内最小 citation_index 排序。"""
+        n = len(self._index)
+        parent = array("I", range(n))
+
+        def find(x: int) -> int:
+            root = x
+            while parent[root] != root:
+                root = parent[root]
+            while parent[x] != root:
+                parent[x], x = root, parent[x]
+            return root
+
+        joined = set()
+        # 每段 ROWS 个 16 位槽位恰为一个 64 位整数，按步长切片即得该段全部键
+        words = array("Q", bytes(self._sigs))
+        for band in range(BANDS):
+            keys = words[band::BANDS]
+            order = sorted(range(n), key=keys.__getitem__)
+            head = None
+            for p in order:
+                if head is None or keys[p] != keys[head]:
+                    head = p
+                    continue
+                rh, rp = find(head), find(p)
+                if rh != rp and self._similarity(head, p) >= self.threshold:
+                    parent[rp] = rh
+                    joined.add(rh)
+            del keys, order
+        del words
+
+        members: Dict[int, List[int]] = {}
+        for p in range(n):
+            root = find(p)
+            if root in joined:
+                members.setdefault(root, []).append(p)
+
+        clusters = []
+        for group in members.values():
+            group.sort(key=self._index.__getitem__)
+            first = group[0]
+            exact = all(self._snippet[p] == self._snippet[first] for p in group)
+            clusters.append({
+                "citation_indices": [self._index[p] for p in group],
+                "kind": "exact" if exact else "near",
+                "min_similarity": 1.0 if exact else round(
+                    min(self._similarity(first, p) for p in group[1:]), 4),
+                "distinct_claims": len({self._claim[p] for p in group}),
+                "distinct_page_locators": len({self._page[p] for p in group}),
+            })
+        clusters.sort(key=lambda c: c["citation_indices"][0])
+        for c in clusters:
+            reasons = []
+            if c["distinct_claims"] > 1:
+                reasons.append("SNIPPET_REUSED")
+            if c["distinct_page_locators"] > 1:
+                reasons.append("PAGE_MISMATCH")
+            c["reasons"] = reasons
+        return clusters
+
+
+def citation_signature(citation: Dict, idx: int) -> Optional[Tuple[int, bytes, int, int, int]]:
+    """提取一条引注的去重特征。
+
+    空片段（已计为 MISSING_SNIPPET）与规范化后为空的片段（全是标点 / 符号，
+    签名都相同，会聚成一个虚假的簇）返回 None。
+    """
+    snippet = citation.get("quote_snippet", "").strip()
+    if not snippet:
+        return None
+    norm = normalize(snippet)
+    if not norm:
+        return None
+    return (
+        idx,
+        _signature(norm),
+        _digest(norm),
+        _digest(citation.get("claim", "").strip()),
+        _digest(citation.get("page_locator", "").strip()),
+    )
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+source_index.py - 引文片段溯源索引
+
+为本地文献全文（.txt / .md）建立持久化的字符 n-gram 倒排索引，
+用于离线核对 quote_snippet 是否真实出现在其 notebooklm_source 中。
+
+索引文件为 SQLite 数据库：
+    meta(key, value)                         版本与 n-gram 长度
+    sources(id, name, path, size, mtime)     已索引文献（name 为文件名去后缀）
+    postings(gram, source_id, offsets)       gram 在该文献规范化文本中的全部位置
+                                             （array('I') 原始字节，WITHOUT ROWID 聚簇存放）
+
+匹配方式：片段与原文都先规范化（NFKC、去空白与标点、小写）。取片段的 n-gram
+查倒排表，按「原文位置 - 片段位置」的对角线分桶投票；得分 = 落在同一对角线
+附近的片段 n-gram 占比，可容忍 OCR 错字与少量增删。
+
+用法：
+    python source_index.py build --sources ./sources --index sources.idx
+    python source_index.py query --index sources.idx --snippet "原文片段" [--source "文献名"]
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import unicodedata
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+INDEX_VERSION = "1"
+NGRAM = 3
+SOURCE_SUFFIXES = (".txt", ".md")
+
+# 出现次数超过此值的 gram（如“的一个”）区分度低，查询时跳过
+MAX_POSTINGS = 5000
+# 每个片段最多取这么多个 gram 查询，超长片段均匀抽样
+MAX_QUERY_GRAMS = 64
+# 对角线分桶宽度（字符），容忍片段与原文之间的少量增删
+DIAGONAL_BAND = 8
+
+
+def normalize(text: str) -> str:
+    """NFKC 规范化后去掉空白与标点，并转小写。"""
+    text = unicodedata.normalize("NFKC", text)
+    return "".join(
+        ch.lower() for ch in text
+        if not ch.isspace() and not unicodedata.category(ch).startswith("P")
+    )
+
+
+def _grams(text: str) -> Iterable[Tuple[int, str]]:
+    for i in range(len(text) - NGRAM + 1):
+        yield i, text[i:i + NGRAM]
+
+
+class SourceIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS sources (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                path TEXT NOT NULL UNIQUE,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                gram TEXT NOT NULL,
+                source_id INTEGER NOT NULL,
+                offsets BLOB NOT NULL,
+                PRIMARY KEY (gram, source_id)
+            ) WITHOUT ROWID;
+            """
+        )
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        if not meta:
+            self._db.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [("version", INDEX_VERSION), ("ngram", str(NGRAM))],
+            )
+            self._db.commit()
+        elif meta.get("version") != INDEX_VERSION or meta.get("ngram") != str(NGRAM):
+            raise ValueError(f"索引格式不兼容，请删除后重建: {path}")
+        self._sources: Optional[List[Tuple[int, str]]] = None
+        # 当前写入临时表 hint_sources 的候选文献；相邻引注多出自同一文献，相同时不重写
+        self._hinted: Optional[Tuple[int, ...]] = None
+
+    def close(self) -> None:
+        self._db.close()
+
+    # ── 建索引 ──────────────────────────────────────────────────────────────
+    def build(self, folder: Path) -> Tuple[int, int]:
+        """增量索引目录下的文献：未变化的文件跳过，已删除的文件移出索引。
+
+        返回 (新建或更新的文献数, 移除的文献数)。
+        """
+        known = {
+            path: (sid, size, mtime)
+            for sid, path, size, mtime in self._db.execute(
+                "SELECT id, path, size, mtime FROM sources")
+        }
+        seen = set()
+        updated = 0
+        for f in sorted(folder.rglob("*")):
+            if not f.is_file() or f.suffix.lower() not in SOURCE_SUFFIXES:
+                continue
+            key = str(f.resolve())
+            seen.add(key)
+            st = f.stat()
+            old = known.get(key)
+            if old is not None and old[1] == st.st_size and old[2] == st.st_mtime:
+                continue
+            if old is not None:
+                self._remove(old[0])
+            self._add(f, key, st.st_size, st.st_mtime)
+            updated += 1
+
+        removed = 0
+        for key, (sid, _, _) in known.items():
+            if key not in seen:
+                self._remove(sid)
+                removed += 1
+        self._db.commit()
+        self._sources = None
+        self._hinted = None
+        return updated, removed
+
+    def _add(self, f: Path, key: str, size: int, mtime: float) -> None:
+        text = normalize(f.read_text(encoding="utf-8", errors="replace"))
+        cur = self._db.execute(
+            "INSERT INTO sources (name, path, size, mtime) VALUES (?, ?, ?, ?)",
+            (f.stem, key, size, mtime),
+        )
+        sid = cur.lastrowid
+        postings: Dict[str, array] = defaultdict(lambda: array("I"))
+        for pos, gram in _grams(text):
+            postings[gram].append(pos)
+        self._db.executemany(
+            "INSERT INTO postings VALUES (?, ?, ?)",
+            ((gram, sid, offsets.tobytes()) for gram, offsets in postings.items()),
+        )
+
+    def _remove(self, sid: int) -> None:
+        self._db.execute("DELETE FROM postings WHERE source_id = ?", (sid,))
+        self._db.execute("DELETE FROM sources WHERE id = ?", (sid,))
+
+    # ── 查询 ───────────────────────────────────────────────────────────────
+    def sources(self) -> List[Tuple[int, str]]:
+        if self._sources is None:
+            self._sources = list(self._db.execute("SELECT id, name FROM sources"))
+        return self._sources
+
+    def candidates(self, source_hint: str) -> Optional[List[int]]:
+        """按 notebooklm_source 文本匹配文献：文件名出现在来源描述中，或反之。
+
+        无法匹配时返回 None，表示不限定文献。
+        """
+        hint = normalize(source_hint or "")
+        if hint:
+            matched = [
+                sid for sid, name in self.sources()
+                if (n := normalize(name)) and (n in hint or hint in n)
+            ]
+            if matched:
+                return matched
+        return None
+
+    def _hint_sources(self, sids: List[int]) -> None:
+        """把候选文献写入临时表，供查询 JOIN（避免 IN (?, ...) 超出 SQLite 变量上限）。"""
+        key = tuple(sids)
+        if key == self._hinted:
+            return
+        self._db.execute("CREATE TEMP TABLE IF NOT EXISTS hint_sources (id INTEGER PRIMARY KEY)")
+        self._db.execute("DELETE FROM hint_sources")
+        self._db.executemany("INSERT INTO hint_sources VALUES (?)", ((sid,) for sid in sids))
+        self._hinted = key
+
+    def verify(self, snippet: str, source_hint: str = "") -> Dict:
+        """返回片段在候选文献中的最佳匹配：score ∈ [0, 1]、文献名与大致位置。"""
+        text = normalize(snippet)
+        grams = list(_grams(text))
+        result = {"score": 0.0, "source": None, "offset": None}
+        if not grams:
+            # 短于 n-gram 的片段无法可靠定位，按未核实处理
+            return result
+        if len(grams) > MAX_QUERY_GRAMS:
+            step = len(grams) / MAX_QUERY_GRAMS
+            grams = [grams[int(k * step)] for k in range(MAX_QUERY_GRAMS)]
+
+        if not self.sources():
+            return result
+        sids = self.candidates(source_hint)
+        if sids is None:
+            sql = ("SELECT source_id, offsets FROM postings "
+                   "WHERE gram = ? AND length(offsets) <= ?")
+        else:
+            self._hint_sources(sids)
+            sql = ("SELECT p.source_id, p.offsets FROM postings p "
+                   "JOIN hint_sources h ON h.id = p.source_id "
+                   "WHERE p.gram = ? AND length(p.offsets) <= ?")
+        limit = MAX_POSTINGS * 4
+
+        votes: Dict[Tuple[int, int], set] = defaultdict(set)
+        for qpos, gram in grams:
+            for sid, blob in self._db.execute(sql, (gram, limit)):
+                offsets = array("I")
+                offsets.frombytes(blob)
+                for off in offsets:
+                    votes[(sid, (off - qpos) // DIAGONAL_BAND)].add(qpos)
+
+        best = 0
+        best_key = None
+        for (sid, band), hits in votes.items():
+            # 合并相邻分桶，避免恰好跨桶边界的对齐被拆散
+            merged = len(hits | votes.get((sid, band + 1), set()))
+            if merged > best:
+                best, best_key = merged, (sid, band)
+        if best_key is None:
+            return result
+
+        names = dict(self.sources())
+        result["score"] = round(best / len(grams), 4)
+        result["source"] = names.get(best_key[0])
+        result["offset"] = max(0, best_key[1] * DIAGONAL_BAND)
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="引文片段溯源索引（字符 n-gram 倒排表）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="索引（或增量更新）文献目录")
+    p_build.add_argument("--sources", required=True, help="文献全文目录（.txt / .md）")
+    p_build.add_argument("--index", required=True, help="索引文件路径")
+
+    p_query = sub.add_parser("query", help="核对单个片段")
+    p_query.add_argument("--index", required=True, help="索引文件路径")
+    p_query.add_argument("--snippet", required=True, help="待核对的引文片段")
+    p_query.add_argument("--source", default="", help="notebooklm_source 文本，用于限定文献")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        folder = Path(args.sources)
+        if not folder.is_dir():
+            print(f"Error: {folder} is not a directory", file=sys.stderr)
+            sys.exit(1)
+        index = SourceIndex(args.index)
+        updated, removed = index.build(folder)
+        total = len(index.sources())
+        index.close()
+        print(f"索引完成: {total} 篇文献（更新 {updated}，移除 {removed}）→ {args.index}",
+              file=sys.stderr)
+        return
+
+    if not Path(args.index).exists():
+        print(f"Error: File not found: {args.index}", file=sys.stderr)
+        sys.exit(1)
+    index = SourceIndex(args.index)
+    print(json.dumps(index.verify(args.snippet, args.source), ensure_ascii=False))
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+bench_format.py — 排版 / 校验性能基准与回归检查
+
+生成 10–20000 段的合成稿件（标题、副标题、摘要 / 关键词、引文、各级节标题、
+「[n] 注文」脚注行与正文混排，覆盖 classify_paragraph 的全部分支），
+逐个规模计时 format_document 与 validate，报告吞吐量（段/秒、MB/秒）与峰值内存，
+并与保存的基线比较：任一项耗时或内存超出基线 --threshold 即判为回归。
+另单独计时 run 层字体直写（set_runs_fonts）在 --runs 个 run（默认 60000）上的耗时，
+分无 rPr 与已有 rFonts 两种输入，一并纳入基线比较。
+
+每次测量在独立子进程中进行，峰值内存（ru_maxrss）互不干扰；耗时取 --repeat 次最好成绩。
+
+用法:
+    python3 bench_format.py                                  # 与 bench_baseline.json 比较
+    python3 bench_format.py --sizes 10,1000 --repeat 1
+    python3 bench_format.py --save-baseline                  # 以本次结果覆盖基线
+    python3 bench_format.py --json bench.json --keep 稿件目录/
+    python3 bench_format.py --runs 100000 --runs-legacy     # 附带逐 run 代理写法作对照
+
+基线只在同一台机器上有意义：机器指纹（系统、架构、CPU 型号与核数、Python 版本）
+与基线不一致时只打印结果、不判回归，提示用 --save-baseline 在本机重建。
+
+退出码:
+    0  无回归（或无可比基线 / 基线来自其他机器）
+    1  存在回归 / 合成稿件未覆盖全部分类分支
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+# ── 将 lib/ 加入查找路径 ────────────────────────────────────────────────────
+sys.path.insert(0, str(Path(__file__).parent))
+
+from docx import Document
+
+from lib.specs import STYLE_NAMES
+from lib.paragraph_rules import classify_text
+from lib.profiling import StageProfiler, peak_rss_mb
+
+DEFAULT_SIZES = "10,100,1000,5000,20000"
+DEFAULT_RUNS = 60000
+_RUNS_PER_PARAGRAPH = 6
+DEFAULT_BASELINE = Path(__file__).parent / "bench_baseline.json"
+BASELINE_VERSION = 1
+
+# 低于此耗时的差异视为计时噪声，不判回归
+_NOISE_FLOOR_S = 0.05
+
+_SENTENCES = [
+    "罗马共和国的公民大会具有直接民主的特征",
+    "元老院掌握财政与外交大权",
+    "平民保民官可以否决执政官的命令",
+    "格拉古兄弟的改革触动了土地占有者的利益",
+    "马略的军事改革改变了军队的社会构成",
+    "苏拉的独裁打破了共和国的政治惯例",
+    "西塞罗在演说中反复援引祖先习俗",
+    "行省总督的权力在共和晚期不断扩张",
+]
+
+# 章节内的段落配方：(样式名, 文本生成方式)；样式名为 None 时使用 Normal
+_CHAPTER_HEAD = [
+    ("Heading 1", "chapter"),       # title_main（样式）
+    ("Subtitle", "subtitle"),       # subtitle（样式）
+]
+# 前几段即覆盖全部分支，最小规模（10 段）的稿件也能经过每条分类规则
+_BODY_MIX = [
+    ("Quote", "quote"),             # quote（样式）
+    (None, "section_cn"),           # section_l2：（一）
+    (None, "body_marked"),          # body，句中带 [n] 标记
+    (None, "footnote"),             # footnote：[n] 注文
+    (None, "body"),
+    (None, "body"),
+    (None, "section_num"),          # section_l2：1.
+    (None, "body"),
+    ("Heading 3", "section_head"),  # section_l2（样式）
+    (None, "body"),
+    ("Intense Quote", "quote"),
+    (None, "body"),
+    (None, "empty"),
+]
+
+
+class _Generator:
+    def __init__(self, seed: int):
+        self.rnd = random.Random(seed)
+        self.chapter_no = 0
+        self.section_no = 0
+        self.note_no = 0
+
+    def sentence(self) -> str:
+        return "，".join(self.rnd.choice(_SENTENCES) for _ in range(self.rnd.randint(2, 5))) + "。"
+
+    def text(self, kind: str) -> str:
+        if kind == "chapter":
+            self.chapter_no += 1
+            self.section_no = 0
+            return f"第{self.chapter_no}章 {self.rnd.choice(_SENTENCES)}"
+        if kind == "subtitle":
+            return "——" + self.rnd.choice(_SENTENCES)
+        if kind == "section_cn":
+            self.section_no += 1
+            return f"（{'一二三四五六七八九十'[self.section_no % 10]}）{self.rnd.choice(_SENTENCES)}"
+        if kind == "section_num":
+            return f"{self.chapter_no}.{self.section_no} {self.rnd.choice(_SENTENCES)}"
+        if kind == "section_head":
+            return self.rnd.choice(_SENTENCES)
+        if kind == "quote":
+            return "“" + self.sentence() + "”"
+        if kind == "body_marked":
+            self.note_no += 1
+            return self.sentence() + f"[{self.note_no}]" + self.sentence()
+        if kind == "footnote":
+            return f"[{max(self.note_no, 1)}] Cicero, De Officiis, I.{self.rnd.randint(1, 160)}."
+        if kind == "empty":
+            return ""
+        return self.sentence() * self.rnd.randint(1, 3)
+
+
+def _front_matter(gen: _Generator) -> list:
+    return [
+        ("Title", "罗马共和国晚期的政治危机"),
+        (None, "摘要：" + gen.sentence()),          # abstract_label
+        (None, "关键词：罗马共和国；元老院；公民大会"),  # abstract_label
+        (None, "摘要 " + gen.sentence()),           # abstract_text
+    ]
+
+
+def manuscript_plan(paragraphs: int, seed: int = 0) -> list:
+    """返回 paragraphs 个 (样式名, 文本) —— 合成稿件的段落序列。"""
+    gen = _Generator(seed)
+    plan = _front_matter(gen)
+    while len(plan) < paragraphs:
+        for style, kind in _CHAPTER_HEAD + _BODY_MIX * 4:
+            plan.append((style, gen.text(kind)))
+    return plan[:paragraphs]
+
+
+def write_manuscript(path: Path, paragraphs: int, seed: int = 0) -> None:
+    doc = Document()
+    rnd = random.Random(seed)
+    for style, text in manuscript_plan(paragraphs, seed):
+        para = doc.add_paragraph(style=style)
+        if not text:
+            continue
+        # 拆成 1–3 个 run，偶尔带斜体，使 run 层字体处理有代表性
+        cuts = sorted(rnd.sample(range(1, len(text)), min(len(text) - 1, rnd.randint(0, 2))))
+        for a, b in zip([0] + cuts, cuts + [len(text)]):
+            run = para.add_run(text[a:b])
+            if rnd.random() < 0.05:
+                run.italic = True
+    doc.save(str(path))
+
+
+def classification_coverage(paragraphs: int, seed: int = 0) -> set:
+    """合成稿件命中的分类结果集合（HR- 样式名）。"""
+    return {classify_text(text, style or "Normal") for style, text in manuscript_plan(paragraphs, seed)}
+
+
+# ── 子进程中的单次测量 ─────────────────────────────────────────────────────
+
+def _measure_format(src: str, dst: str) -> dict:
+    from lib.formatter import format_document
+
+    profiler = StageProfiler()
+    t0 = time.perf_counter()
+    format_document(Path(src), Path(dst), profiler=profiler)
+    seconds = time.perf_counter() - t0
+    prof = profiler.to_dict()
+    return {
+        "seconds": seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "counts": prof["counts"],
+        "stages": {s["name"]: s["seconds"] for s in prof["stages"]},
+    }
+
+
+def _measure_validate(path: str) -> dict:
+    from lib.validation import validate
+
+    t0 = time.perf_counter()
+    results = validate(path)
+    seconds = time.perf_counter() - t0
+    return {
+        "seconds": seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "failed_checks": sum(1 for r in results if r[0] == "FAIL"),
+    }
+
+
+def _run_font_body(runs: int, styled: bool):
+    """runs 个 run 的 <w:body>，每段 _RUNS_PER_PARAGRAPH 个；styled 时每个 run 已带 rFonts。"""
+    from docx.oxml import parse_xml
+
+    rpr = ('<w:rPr><w:rFonts w:ascii="Arial" w:hAnsi="Arial" w:eastAsia="黑体"/></w:rPr>'
+           if styled else "")
+    run = f"<w:r>{rpr}<w:t>{_SENTENCES[0]}</w:t></w:r>"
+    paragraphs, rest = divmod(runs, _RUNS_PER_PARAGRAPH)
+    body = "".join(["<w:p>" + run * _RUNS_PER_PARAGRAPH + "</w:p>"] * paragraphs)
+    if rest:
+        body += "<w:p>" + run * rest + "</w:p>"
+    return parse_xml('<w:body xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                     + body + "</w:body>")
+
+
+def _measure_run_fonts(runs: int, styled: bool, legacy: bool) -> dict:
+    from docx.oxml.ns import qn
+    from docx.text.paragraph import Paragraph
+    from lib.font_utils import set_run_fonts, set_runs_fonts
+    from lib.specs import DEFAULT_SPEC
+
+    body = _run_font_body(runs, styled)
+    latin, east = DEFAULT_SPEC.font_latin, DEFAULT_SPEC.font_body_east
+    t0 = time.perf_counter()
+    for p in body.iterchildren(qn("w:p")):
+        if legacy:
+            for run in Paragraph(p, None).runs:
+                set_run_fonts(run, latin, east)
+        else:
+            set_runs_fonts(p.r_lst, latin, east)
+    return {"seconds": time.perf_counter() - t0, "peak_rss_mb": peak_rss_mb()}
+
+
+def run_font_benchmark(runs: int, repeat: int, legacy: bool) -> dict:
+    rows = {}
+    for variant, styled in (("bare", False), ("styled", True)):
+        bulk = _best(_measure_run_fonts, (runs, styled, False), repeat)
+        row = {
+            "seconds": round(bulk["seconds"], 4),
+            "runs_per_s": round(runs / bulk["seconds"], 1),
+            "peak_rss_mb": bulk["peak_rss_mb"],
+        }
+        line = (f"  run 字体 {variant:<6} {runs} 个  {bulk['seconds']:7.3f}s "
+                f"({runs / bulk['seconds']:10.1f} run/s)")
+        if legacy:
+            old = _best(_measure_run_fonts, (runs, styled, True), repeat)
+            row["legacy_seconds"] = round(old["seconds"], 4)
+            line += f"  逐 run 代理 {old['seconds']:7.3f}s（×{old['seconds'] / bulk['seconds']:.1f}）"
+        rows[variant] = row
+        print(line, flush=True)
+    return {"runs": runs, **rows}
+
+
+def _isolated(fn, *args) -> dict:
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def _best(fn, args: tuple, repeat: int) -> dict:
+    runs = [_isolated(fn, *args) for _ in range(max(1, repeat))]
+    best = min(runs, key=lambda r: r["seconds"])
+    best["peak_rss_mb"] = max(r["peak_rss_mb"] or 0 for r in runs) or None
+    return best
+
+
+def run_benchmark(sizes: list, workdir: Path, repeat: int, seed: int) -> list:
+    rows = []
+    for n in sizes:
+        src = workdir / f"manuscript_{n}.docx"
+        dst = workdir / f"manuscript_{n}.formatted.docx"
+        write_manuscript(src, n, seed)
+        mb = src.stat().st_size / 1e6
+
+        fmt = _best(_measure_format, (str(src), str(dst)), repeat)
+        val = _best(_measure_validate, (str(dst),), repeat)
+        rows.append({
+            "paragraphs": n,
+            "input_mb": round(mb, 4),
+            "format": {
+                "seconds": round(fmt["seconds"], 4),
+                "paragraphs_per_s": round(n / fmt["seconds"], 1),
+                "mb_per_s": round(mb / fmt["seconds"], 3),
+                "peak_rss_mb": fmt["peak_rss_mb"],
+                "runs": fmt["counts"].get("runs"),
+                "stages": {k: round(v, 4) for k, v in fmt["stages"].items()},
+            },
+            "validate": {
+                "seconds": round(val["seconds"], 4),
+                "paragraphs_per_s": round(n / val["seconds"], 1),
+                "peak_rss_mb": val["peak_rss_mb"],
+                "failed_checks": val["failed_checks"],
+            },
+        })
+        print(f"  {n:>6} 段  排版 {fmt['seconds']:8.3f}s ({n / fmt['seconds']:9.1f} 段/s, "
+              f"{fmt['peak_rss_mb'] or 0:6.1f} MB)  校验 {val['seconds']:7.3f}s "
+              f"({val['peak_rss_mb'] or 0:6.1f} MB)", flush=True)
+    return rows
+
+
+def compare(rows: list, baseline: dict, threshold: float) -> list:
+    """返回回归描述列表；基线中没有的规模跳过。"""
+    base_rows = {r["paragraphs"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for row in rows:
+        base = base_rows.get(row["paragraphs"])
+        if base is None:
+            continue
+        for op in ("format", "validate"):
+            cur, ref = row[op], base[op]
+            limit = ref["seconds"] * (1 + threshold)
+            if cur["seconds"] > limit and cur["seconds"] - ref["seconds"] > _NOISE_FLOOR_S:
+                regressions.append(f"{row['paragraphs']} 段 {op} 耗时 {cur['seconds']:.3f}s "
+                                   f"> 基线 {ref['seconds']:.3f}s × {1 + threshold:.2f}")
+            if cur["peak_rss_mb"] and ref.get("peak_rss_mb") and \
+                    cur["peak_rss_mb"] > ref["peak_rss_mb"] * (1 + threshold):
+                regressions.append(f"{row['paragraphs']} 段 {op} 峰值内存 {cur['peak_rss_mb']:.1f}MB "
+                                   f"> 基线 {ref['peak_rss_mb']:.1f}MB × {1 + threshold:.2f}")
+    return regressions
+
+
+def compare_run_fonts(cur: dict, ref: dict, threshold: float) -> list:
+    """run 层字体计时的回归描述；run 数与基线不同时不比较。"""
+    if not cur or not ref or cur.get("runs") != ref.get("runs"):
+        return []
+    regressions = []
+    for variant in ("bare", "styled"):
+        now, base = cur.get(variant), ref.get(variant)
+        if not now or not base:
+            continue
+        if now["seconds"] > base["seconds"] * (1 + threshold) and \
+                now["seconds"] - base["seconds"] > _NOISE_FLOOR_S:
+            regressions.append(f"run 字体 {variant} {cur['runs']} 个 耗时 {now['seconds']:.3f}s "
+                               f"> 基线 {base['seconds']:.3f}s × {1 + threshold:.2f}")
+    return regressions
+
+
+# 决定基线可比性的机器字段；platform 含内核小版本，只作展示
+_FINGERPRINT_KEYS = ("system", "machine", "cpu", "cpus", "python")
+
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def _machine() -> dict:
+    return {
+        "platform": platform.platform(),
+        "system": platform.system(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu": _cpu_model(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def fingerprint_mismatch(base: dict, current: dict) -> list:
+    """返回与基线不一致的机器指纹字段；旧基线缺少的字段同样算不一致。"""
+    return [key for key in _FINGERPRINT_KEYS if base.get(key) != current.get(key)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="排版 / 校验性能基准（合成稿件）")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"逗号分隔的段落数（默认 {DEFAULT_SIZES}）")
+    parser.add_argument("--repeat", type=int, default=3, help="每项计时取最好成绩的重复次数（默认 3）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE),
+                        help="基线 JSON（默认 scripts/bench_baseline.json）")
+    parser.add_argument("--save-baseline", action="store_true", help="以本次结果覆盖基线，不做比较")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="回归阈值：超出基线的比例（默认 0.25）")
+    parser.add_argument("--json", help="本次结果另存为 JSON")
+    parser.add_argument("--keep", metavar="DIR", help="保留合成稿件与排版输出到该目录")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS,
+                        help=f"run 层字体计时的 run 数（默认 {DEFAULT_RUNS}，0 为跳过）")
+    parser.add_argument("--runs-legacy", action="store_true",
+                        help="run 层字体计时附带逐 run 代理写法（set_run_fonts）作对照")
+    args = parser.parse_args()
+
+    try:
+        sizes = sorted({int(s) for s in args.sizes.split(",") if s.strip()})
+    except ValueError:
+        print(f"Error: --sizes 需为逗号分隔的整数: {args.sizes}")
+        sys.exit(1)
+    if not sizes or sizes[0] < 1:
+        print("Error: --sizes 至少包含一个正整数")
+        sys.exit(1)
+    if args.runs < 0:
+        print("Error: --runs 不能为负数")
+        sys.exit(1)
+
+    missing = set(STYLE_NAMES.values()) - classification_coverage(max(sizes), args.seed)
+    if missing:
+        print(f"Error: 合成稿件未覆盖分类分支: {', '.join(sorted(missing))}")
+        sys.exit(1)
+
+    print(f"[基准] 规模 {', '.join(map(str, sizes))} 段  repeat={args.repeat}")
+    if args.keep:
+        workdir = Path(args.keep)
+        workdir.mkdir(parents=True, exist_ok=True)
+        rows = run_benchmark(sizes, workdir, args.repeat, args.seed)
+    else:
+        with tempfile.TemporaryDirectory(prefix="hr-bench-") as tmp:
+            rows = run_benchmark(sizes, Path(tmp), args.repeat, args.seed)
+    run_fonts = run_font_benchmark(args.runs, args.repeat, args.runs_legacy) if args.runs else None
+
+    result = {
+        "version": BASELINE_VERSION,
+        "machine": _machine(),
+        "params": {"repeat": args.repeat, "seed": args.seed},
+        "results": rows,
+    }
+    if run_fonts is not None:
+        result["run_fonts"] = run_fonts
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"[基线] 已写入 {baseline_path}")
+        return
+
+    if not baseline_path.exists():
+        print(f"[基线] {baseline_path} 不存在，跳过回归比较（可用 --save-baseline 生成）")
+        return
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    base_machine = baseline.get("machine", {})
+    mismatch = fingerprint_mismatch(base_machine, result["machine"])
+    if mismatch:
+        for key in mismatch:
+            print(f"[基线] 机器不一致 {key}: 基线 {base_machine.get(key)!r}，本机 {result['machine'][key]!r}")
+        print(f"[基线] 基线来自其他机器，跳过回归判定；请在本机用 --save-baseline 重建 {baseline_path}")
+        return
+
+    regressions = compare(rows, baseline, args.threshold)
+    regressions += compare_run_fonts(run_fonts, baseline.get("run_fonts"), args.threshold)
+    if regressions:
+        for line in regressions:
+            print(f"[回归] {line}")
+        sys.exit(1)
+    print(f"[基线] 无回归（阈值 +{args.threshold:.0%}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+check_classify.py — 批量分类与逐段分类一致性检查
+
+构造一份覆盖全部分类分支的文档（空段、已有 HR- 样式、各内置样式映射、各条文本规则、
+默认正文），另拼接 bench_format.py 的合成稿件，保存后重新读入，确认
+classify_many(段落) 与逐段 classify_paragraph 的结果完全一致，且每个分支用例都落到预期分类。
+
+用法:
+    python3 check_classify.py
+    python3 check_classify.py --paragraphs 5000 --verbose
+
+退出码:
+    0  结果一致且覆盖全部分支
+    1  存在不一致或有分支未被覆盖
+"""
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+
+from bench_format import manuscript_plan
+from lib.specs import STYLE_NAMES
+from lib.paragraph_rules import classify_many, classify_paragraph
+
+# (分支, 样式名, 文本, 期望的 STYLE_NAMES 键)；样式名为 None 时使用 Normal
+BRANCH_CASES = [
+    ("空段", None, "", "body"),
+    ("仅空白", "Heading 1", "   ", "body"),
+    ("已有 HR- 样式", STYLE_NAMES["quote"], "（一）样式优先于文本规则", "quote"),
+    ("Heading 1", "Heading 1", "罗马共和国", "title_main"),
+    ("Title", "Title", "罗马共和国", "title_main"),
+    ("Heading 2", "Heading 2", "罗马共和国", "subtitle"),
+    ("Subtitle", "Subtitle", "罗马共和国", "subtitle"),
+    ("Heading 3", "Heading 3", "罗马共和国", "section_l2"),
+    ("Heading 4", "Heading 4", "罗马共和国", "section_l2"),
+    ("Quote", "Quote", "罗马共和国", "quote"),
+    ("Block", "Block Text", "罗马共和国", "quote"),
+    ("Footnote", "Footnote Text", "罗马共和国", "footnote"),
+    ("摘要标签", None, "摘要：罗马共和国", "abstract_label"),
+    ("关键词标签", None, "关 键 词:罗马；元老院", "abstract_label"),
+    ("摘要正文", None, "摘要 罗马共和国", "abstract_text"),
+    ("二级标题（一）", None, "（一）罗马共和国", "section_l2"),
+    ("二级标题 一、", None, "一、罗马共和国", "section_l2"),
+    ("二级标题 1.2", None, "1.2 罗马共和国", "section_l2"),
+    ("脚注 [n]", None, "[1] Cicero, De Officiis.", "footnote"),
+    ("脚注 n", None, "12 Cicero, De Officiis.", "footnote"),
+    ("默认正文", None, "罗马共和国的公民大会", "body"),
+    ("未映射的样式", "Body Text", "罗马共和国的公民大会", "body"),
+]
+
+
+def build_document(path: Path, paragraphs: int) -> list:
+    """写出分支用例 + 合成稿件，返回每段对应的分支说明。"""
+    doc = Document()
+    names = {s.name for s in doc.styles}
+    branches = []
+    cases = [case[:3] for case in BRANCH_CASES] + \
+        [("合成稿件", style, text) for style, text in manuscript_plan(paragraphs)]
+    for branch, style, text in cases:
+        if style is not None and style not in names:
+            doc.styles.add_style(style, WD_STYLE_TYPE.PARAGRAPH)
+            names.add(style)
+        doc.add_paragraph(text, style=style)
+        branches.append(branch)
+    doc.save(str(path))
+    return branches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="检查 classify_many 与逐段 classify_paragraph 结果一致")
+    parser.add_argument("--paragraphs", type=int, default=1000,
+                        help="附加的合成稿件段落数（默认 1000）")
+    parser.add_argument("--verbose", action="store_true", help="列出每个分支的分类结果")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="hr-classify-") as tmp:
+        path = Path(tmp) / "branches.docx"
+        branches = build_document(path, max(0, args.paragraphs))
+        paragraphs = Document(str(path)).paragraphs
+
+    expected = [classify_paragraph(p) for p in paragraphs]
+    labels = classify_many(paragraphs)
+    mismatches = [(i, branches[i], e, l) for i, (e, l) in enumerate(zip(expected, labels)) if e != l]
+    if len(labels) != len(expected):
+        mismatches.append((-1, "长度", len(expected), len(labels)))
+
+    # 元组输入与段落输入应给出同样的结果
+    tuples = [(p.text, p.style.name if p.style else "") for p in paragraphs]
+    tuple_labels = classify_many(tuples)
+    mismatches += [(i, branches[i] + "（元组）", e, l)
+                   for i, (e, l) in enumerate(zip(expected, tuple_labels)) if e != l]
+
+    # 每个分支用例须落到预期的分类，证明文档确实经过了该分支
+    wrong_branches = [(case[0], STYLE_NAMES[case[3]], label)
+                      for case, label in zip(BRANCH_CASES, expected)
+                      if STYLE_NAMES[case[3]] != label]
+
+    if args.verbose:
+        for branch, label in zip(branches[:len(BRANCH_CASES)], labels):
+            print(f"  {branch:<16} → {label}")
+
+    missing_labels = set(STYLE_NAMES.values()) - set(expected)
+    print(f"  段落 {len(paragraphs)}  分支用例 {len(BRANCH_CASES)}  不一致 {len(mismatches)}")
+    for i, branch, exp, got in mismatches[:20]:
+        print(f"  ❌ #{i} {branch}: classify_paragraph={exp}  classify_many={got}")
+    for branch, want, got in wrong_branches:
+        print(f"  ❌ 分支「{branch}」预期 {want}，实际 {got}")
+    if missing_labels:
+        print(f"  ❌ 未覆盖的分类结果: {', '.join(sorted(missing_labels))}")
+
+    failed = bool(mismatches or missing_labels or wrong_branches)
+    print()
+    print("结果: " + ("classify_many 与逐段分类不一致或有分支未覆盖" if failed
+                     else "classify_many 与逐段分类完全一致，全部分支已覆盖"))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+check_startup.py — 命令行入口冷启动预算检查
+
+以 `python -X importtime` 运行 format_docx.py / validate_docx.py 的 --help 与参数错误路径，
+统计顶层导入的累计耗时，并确认这些路径没有导入 python-docx、lxml 或进程池模块
+（它们应在参数校验通过后才加载）。
+
+用法:
+    python3 check_startup.py
+    python3 check_startup.py --budget-ms 80 --repeat 5 --verbose
+
+退出码:
+    0  全部场景在预算内且未导入重模块
+    1  超出预算或启动路径导入了重模块
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).parent
+
+DEFAULT_BUDGET_MS = 120.0
+
+# 参数校验通过前不应出现在导入链中的模块（前缀匹配）
+HEAVY_MODULES = ("docx", "lxml", "concurrent.futures", "multiprocessing")
+
+# (说明, 脚本, 参数)；参数错误场景都应在导入重模块前以退出码 1 结束
+SCENARIOS = [
+    ("format --help", "format_docx.py", ["--help"]),
+    ("validate --help", "validate_docx.py", ["--help"]),
+    ("format 输入不存在", "format_docx.py", ["-i", "__missing__.docx", "-o", "__out__.docx"]),
+    ("format 非 .docx", "format_docx.py", ["-i", __file__, "-o", "__out__.docx"]),
+    ("format 缺少参数", "format_docx.py", []),
+    ("validate 输入不存在", "validate_docx.py", ["__missing__.docx"]),
+]
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str):
+    """返回 (顶层导入累计微秒数, 全部已导入模块名列表)。"""
+    total = 0
+    modules = []
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m is None:
+            continue
+        modules.append(m.group(4))
+        if len(m.group(3)) == 1:  # 顶层导入：名称前只有一个空格
+            total += int(m.group(2))
+    return total, modules
+
+
+def measure(script: str, args: list, repeat: int):
+    """运行 repeat 次，返回 (最短累计导入毫秒数, 导入的重模块, 退出码)。"""
+    best = None
+    heavy = set()
+    code = None
+    for _ in range(max(1, repeat)):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", str(SCRIPTS_DIR / script), *args],
+            capture_output=True, text=True, cwd=SCRIPTS_DIR,
+        )
+        total, modules = parse_importtime(proc.stderr)
+        best = total if best is None else min(best, total)
+        heavy.update(m for m in modules
+                     if any(m == h or m.startswith(h + ".") for h in HEAVY_MODULES))
+        code = proc.returncode
+    return best / 1000, sorted(heavy), code
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="检查排版 / 校验入口的冷启动导入开销")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"每个场景顶层导入累计耗时上限（默认 {DEFAULT_BUDGET_MS:.0f} ms）")
+    parser.add_argument("--repeat", type=int, default=3, help="每个场景取最好成绩的运行次数（默认 3）")
+    parser.add_argument("--verbose", action="store_true", help="列出导入的重模块全名")
+    args = parser.parse_args()
+
+    failed = False
+    for label, script, script_args in SCENARIOS:
+        ms, heavy, code = measure(script, script_args, args.repeat)
+        problems = []
+        if ms > args.budget_ms:
+            problems.append(f"超出预算 {args.budget_ms:.0f} ms")
+        if heavy:
+            roots = sorted({h for h in HEAVY_MODULES for m in heavy
+                            if m == h or m.startswith(h + ".")})
+            problems.append("导入了 " + ", ".join(roots))
+        expected = 0 if "--help" in script_args else (2 if not script_args else 1)
+        if code != expected:
+            problems.append(f"退出码 {code}（预期 {expected}）")
+
+        marker = "❌" if problems else "✅"
+        print(f"  {marker} {label:<20} {ms:7.1f} ms" + (f"  {'；'.join(problems)}" if problems else ""))
+        if heavy and args.verbose:
+            print("       " + " ".join(heavy))
+        failed = failed or bool(problems)
+
+    print()
+    print("结果: " + ("存在超预算或提前导入重模块的入口" if failed else f"全部入口在 {args.budget_ms:.0f} ms 预算内"))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
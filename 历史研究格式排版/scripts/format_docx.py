@@ -5,10 +5,15 @@ format_docx.py — 《历史研究》期刊排版主入口
 用法:
     python3 format_docx.py --input 论文.docx --output 排版后.docx
     python3 format_docx.py --input 论文.docx --output 排版后.docx --no-backup
+    python3 format_docx.py --batch 稿件目录/ --output 输出目录/ --jobs 8
+    python3 format_docx.py --input 论文.docx --output 排版后.docx --no-cache
+    python3 format_docx.py --input 修订稿.docx --output 排版后.docx --incremental
+    python3 format_docx.py --input 论文.docx --output 排版后.docx --real-footnotes
+    python3 format_docx.py --input 论文.docx --output 排版后.docx --profile profile.json
 
 退出码:
     0  成功
-    1  参数错误 / 文件不存在 / 格式错误
+    1  参数错误 / 文件不存在 / 格式错误 / 批量模式下存在失败文件
 """
 
 import argparse
@@ -18,78 +23,24 @@ from pathlib import Path
 # ── 将 lib/ 加入查找路径 ────────────────────────────────────────────────────
 sys.path.insert(0, str(Path(__file__).parent))
 
-from docx import Document
+# 启动路径只导入标准库与轻量模块；python-docx / lxml 及排版流程（lib.formatter）
+# 在参数校验通过后才导入，--help 与参数错误无需承担其导入开销
+from lib.io_utils import (
+    resolve_input, resolve_output, backup_input, resolve_input_dir,
+)
+from lib.batch import default_jobs
 
-from lib.specs import DEFAULT_SPEC, STYLE_NAMES
-from lib.io_utils import resolve_input, resolve_output, backup_input
-from lib.style_factory import ensure_paragraph_styles, apply_base_page_setup
-from lib.font_utils import set_run_fonts, set_style_fonts
-from lib.paragraph_rules import classify_paragraph, apply_paragraph_style
-from lib.footnote_ooxml import set_footnote_restart_each_page
+# 兼容旧的 `from format_docx import format_document` 等用法，按需转发到 lib.formatter
+_FORMATTER_NAMES = frozenset({
+    "format_document", "format_cached", "format_batch",
+})
 
 
-# ── 样式名 → 东亚字体映射 ────────────────────────────────────────────────────
-_STYLE_EAST_FONT: dict[str, str] = {
-    STYLE_NAMES["body"]:           DEFAULT_SPEC.font_body_east,
-    STYLE_NAMES["quote"]:          DEFAULT_SPEC.font_quote_east,
-    STYLE_NAMES["footnote"]:       DEFAULT_SPEC.font_footnote_east,
-    STYLE_NAMES["title_main"]:     DEFAULT_SPEC.font_title_east,
-    STYLE_NAMES["subtitle"]:       DEFAULT_SPEC.font_subtitle_east,
-    STYLE_NAMES["abstract_label"]: DEFAULT_SPEC.font_abstract_label_east,
-    STYLE_NAMES["abstract_text"]:  DEFAULT_SPEC.font_abstract_text_east,
-    STYLE_NAMES["section_l2"]:     DEFAULT_SPEC.font_section_l2_east,
-}
-
-
-def _apply_style_level_fonts(doc) -> None:
-    """在命名样式层面设置拉丁 + 东亚字体，为所有段落提供继承基础。"""
-    latin = DEFAULT_SPEC.font_latin
-    for style_name, east in _STYLE_EAST_FONT.items():
-        if style_name in [s.name for s in doc.styles]:
-            set_style_fonts(doc.styles[style_name], latin, east)
-
-
-def _apply_run_level_fonts(doc) -> None:
-    """对每个 run 直写字体，确保中西文分离不被旧 run 属性覆盖。"""
-    latin = DEFAULT_SPEC.font_latin
-    for para in doc.paragraphs:
-        style_name = para.style.name if para.style else STYLE_NAMES["body"]
-        east = _STYLE_EAST_FONT.get(style_name, DEFAULT_SPEC.font_body_east)
-        for run in para.runs:
-            set_run_fonts(run, latin, east)
-
-
-def _process_paragraphs(doc) -> None:
-    """分类并应用段落样式。"""
-    for para in doc.paragraphs:
-        style_name = classify_paragraph(para)
-        apply_paragraph_style(para, style_name)
-
-
-def format_document(input_path: Path, output_path: Path) -> None:
-    """执行完整排版流程。"""
-    doc = Document(str(input_path))
-
-    # 1. 页面设置（边距）
-    apply_base_page_setup(doc)
-
-    # 2. 注册 / 确保 8 个命名样式存在
-    ensure_paragraph_styles(doc)
-
-    # 3. 样式层字体（继承基础）
-    _apply_style_level_fonts(doc)
-
-    # 4. 段落分类 + 样式应用
-    _process_paragraphs(doc)
-
-    # 5. run 层字体（直写，覆盖旧属性）
-    _apply_run_level_fonts(doc)
-
-    # 6. 保存（必须先 save，OOXML 补丁在 zip 层操作）
-    doc.save(str(output_path))
-
-    # 7. 脚注每页重排（OOXML 直改 settings.xml）
-    set_footnote_restart_each_page(str(output_path))
+def __getattr__(name: str):
+    if name in _FORMATTER_NAMES:
+        from lib import formatter
+        return getattr(formatter, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def _build_parser() -> argparse.ArgumentParser:
@@ -100,16 +51,56 @@ def _build_parser() -> argparse.ArgumentParser:
             "示例:\n"
             "  python3 format_docx.py --input 论文.docx --output 排版后.docx\n"
             "  python3 format_docx.py -i 论文.docx -o 排版后.docx --no-backup\n"
+            "  python3 format_docx.py --batch 稿件/ -o 输出/ --jobs 8\n"
         ),
     )
-    p.add_argument("-i", "--input",  required=True, help="输入 .docx 文件路径")
-    p.add_argument("-o", "--output", required=True, help="输出 .docx 文件路径")
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("-i", "--input", help="输入 .docx 文件路径")
+    src.add_argument("--batch", metavar="DIR",
+                     help="批量排版目录下全部 .docx（此时 --output 为输出目录）")
+    p.add_argument("-o", "--output", required=True,
+                   help="输出 .docx 文件路径（--batch 模式下为输出目录）")
+    p.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=default_jobs(),
+        help="批量模式的并行进程数（默认 CPU 核数）",
+    )
     p.add_argument(
         "--no-backup",
         action="store_true",
         default=False,
         help="不备份原始文件（默认会生成 .bak.docx）",
     )
+    p.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        help="不读写结果缓存（默认按输入内容哈希复用此前的排版输出）",
+    )
+    p.add_argument(
+        "--incremental",
+        action="store_true",
+        default=False,
+        help="增量排版：只重排相对上次输出有改动的段落，并在输出中记录段落哈希",
+    )
+    p.add_argument(
+        "--real-footnotes",
+        action="store_true",
+        default=False,
+        help="把正文 [n] 标记与「[n] 注文」段落转换为 Word 真脚注（footnotes.xml）",
+    )
+    p.add_argument(
+        "--profile",
+        metavar="JSON",
+        help="记录各阶段耗时、峰值内存与段落 / run 数，写入该 JSON（批量模式附整批汇总）",
+    )
+    p.add_argument(
+        "--profile-cprofile",
+        action="store_true",
+        default=False,
+        help="配合 --profile，附带 cProfile 累计耗时最高的函数",
+    )
     return p
 
 
@@ -117,6 +108,19 @@ def main() -> None:
     parser = _build_parser()
     args = parser.parse_args()
 
+    if args.batch:
+        input_dir = resolve_input_dir(args.batch)
+        from lib.formatter import format_batch
+
+        fail_count = format_batch(input_dir, Path(args.output), args.jobs,
+                                  backup=not args.no_backup,
+                                  use_cache=not args.no_cache,
+                                  incremental=args.incremental,
+                                  real_footnotes=args.real_footnotes,
+                                  profile_path=Path(args.profile) if args.profile else None,
+                                  cprofile=args.profile_cprofile)
+        sys.exit(1 if fail_count else 0)
+
     input_path  = resolve_input(args.input)
     output_path = resolve_output(args.output, input_path)
 
@@ -124,9 +128,19 @@ def main() -> None:
         bak = backup_input(input_path)
         print(f"[备份] {bak}")
 
+    from lib.cache import ResultCache
+    from lib.formatter import format_cached
+    from lib.profiling import StageProfiler, write_profile
+
     print(f"[开始] {input_path} → {output_path}")
-    format_document(input_path, output_path)
-    print(f"[完成] 排版输出: {output_path}")
+    cache = None if args.no_cache else ResultCache()
+    profiler = StageProfiler(args.profile_cprofile) if args.profile else None
+    hit = format_cached(input_path, output_path, cache, args.incremental,
+                        args.real_footnotes, profiler)
+    print(f"[完成] 排版输出: {output_path}" + ("（缓存命中）" if hit else ""))
+    if profiler is not None:
+        write_profile(Path(args.profile), [profiler.to_dict()])
+        print(f"[分析] {args.profile}")
 
 
 if __name__ == "__main__":
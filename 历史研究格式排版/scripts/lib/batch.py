@@ -0,0 +1,36 @@
+import os
+from pathlib import Path
+
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def collect_docx(directory: Path) -> list[Path]:
+    """目录下待处理的 .docx（跳过备份文件与 Word 锁文件），按文件名排序。"""
+    return sorted(
+        p for p in directory.glob("*.docx")
+        if p.is_file()
+        and not p.name.endswith(".bak.docx")
+        and not p.name.startswith("~$")
+    )
+
+
+def run_pool(worker, tasks: list, jobs: int):
+    """以进程池执行 worker(*task)，按完成顺序逐个产出结果。
+
+    worker 必须是模块顶层函数并自行捕获异常，单个任务失败不得中断整批。
+    jobs <= 1 时在当前进程内顺序执行。
+    """
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield worker(*task)
+        return
+
+    # 进程池模块导入较重，仅在真正并行时加载（CLI 启动路径只用到 default_jobs）
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+        futures = [pool.submit(worker, *task) for task in tasks]
+        for fut in as_completed(futures):
+            yield fut.result()
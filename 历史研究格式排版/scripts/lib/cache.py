@@ -0,0 +1,141 @@
+import dataclasses
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from .specs import LayoutSpec, DEFAULT_SPEC, STYLE_NAMES
+
+# 排版 / 校验逻辑本身变更（而非规格变更）时递增，使旧缓存整体失效。
+# 规则：任何改变 format_docx / serve 输出字节或校验结果的提交都必须在同一提交中递增此值——
+# spec_fingerprint 只覆盖 LayoutSpec 与 STYLE_NAMES，且增量排版状态（lib/incremental.py）
+# 同样以该指纹判定有效，不递增则旧缓存输出与旧段落哈希会被当作仍然有效。
+# 2: footnotePr 子元素顺序、--real-footnotes；3: 表格 / 文本框 / 页眉页脚 / 脚注尾注纳入排版；
+# 4: 未改动的脚注 / 尾注部件保留原字节
+CACHE_VERSION = 4
+
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("HR_FORMAT_CACHE_DIR", Path.home() / ".cache" / "hr-format")
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def spec_fingerprint(spec: LayoutSpec = DEFAULT_SPEC) -> str:
+    """LayoutSpec 全部字段 + STYLE_NAMES 的指纹；任一字段变化即改变。"""
+    payload = json.dumps(
+        {
+            "version": CACHE_VERSION,
+            "spec": dataclasses.asdict(spec),
+            "styles": STYLE_NAMES,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_digest(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """按输入内容哈希缓存排版输出与校验报告，按总大小做 LRU 淘汰。
+
+    条目以 ``<key>.docx`` / ``<key>.json`` 平铺存放；命中时刷新 mtime，
+    淘汰时删除 mtime 最旧的条目。写入先落临时文件再 ``os.replace``，
+    多个进程同时读写同一缓存目录是安全的。
+    """
+
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 spec: LayoutSpec = DEFAULT_SPEC):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._fingerprint = spec_fingerprint(spec)
+
+    def key(self, kind: str, input_path) -> str:
+        h = hashlib.sha256()
+        h.update(kind.encode("utf-8"))
+        h.update(self._fingerprint.encode("ascii"))
+        h.update(file_digest(input_path).encode("ascii"))
+        return h.hexdigest()
+
+    # ── 排版输出 ────────────────────────────────────────────────────────────
+    def get_file(self, key: str, dest) -> bool:
+        entry = self.root / f"{key}.docx"
+        try:
+            shutil.copyfile(entry, dest)
+        except FileNotFoundError:
+            return False
+        self._touch(entry)
+        return True
+
+    def put_file(self, key: str, src) -> None:
+        self._store(f"{key}.docx", lambda tmp: shutil.copyfile(src, tmp))
+
+    # ── 校验报告 ────────────────────────────────────────────────────────────
+    def get_json(self, key: str):
+        entry = self.root / f"{key}.json"
+        try:
+            data = json.loads(entry.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        self._touch(entry)
+        return data
+
+    def put_json(self, key: str, data) -> None:
+        def write(tmp):
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+        self._store(f"{key}.json", write)
+
+    # ── 内部 ───────────────────────────────────────────────────────────────
+    def _store(self, name: str, writer) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".part")
+        os.close(fd)
+        try:
+            writer(tmp)
+            os.replace(tmp, self.root / name)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        self.evict()
+
+    @staticmethod
+    def _touch(entry: Path) -> None:
+        try:
+            os.utime(entry)
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> None:
+        """总大小超过 max_bytes 时，按最近使用时间从旧到新删除条目。"""
+        entries = []
+        total = 0
+        for p in self.root.iterdir():
+            if p.suffix not in (".docx", ".json"):
+                continue
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, p in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
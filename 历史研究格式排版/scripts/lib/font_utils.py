@@ -14,6 +14,55 @@ def set_run_fonts(run, latin: str, east_asia: str) -> None:
     rFonts.set(qn("w:eastAsia"), east_asia)
 
 
+def set_runs_fonts(r_elements, latin: str, east_asia: str) -> int:
+    """批量直写一组 <w:r> 元素的 rFonts，返回处理的 run 数。
+
+    直接操作 lxml 元素（如 ``p.r_lst`` 的 XPath 结果），不创建 Run / Font
+    代理对象；写出的 rPr / rFonts 位置与属性顺序与 set_run_fonts 完全一致。
+    """
+    from docx.oxml import OxmlElement
+
+    tag_rPr = qn("w:rPr")
+    tag_rFonts = qn("w:rFonts")
+    attr_ascii = qn("w:ascii")
+    attr_hansi = qn("w:hAnsi")
+    attr_east = qn("w:eastAsia")
+    count = 0
+    for r in r_elements:
+        rPr = r.find(tag_rPr)
+        if rPr is None:
+            # 新建的空 rPr：rFonts 直接追加，跳过 python-docx 的后继元素扫描
+            rPr = OxmlElement("w:rPr")
+            r.insert(0, rPr)
+            rFonts = OxmlElement("w:rFonts")
+            rPr.append(rFonts)
+        else:
+            rFonts = rPr.find(tag_rFonts)
+            if rFonts is None:
+                rFonts = rPr.get_or_add_rFonts()
+        rFonts.set(attr_ascii, latin)
+        rFonts.set(attr_hansi, latin)
+        rFonts.set(attr_east, east_asia)
+        count += 1
+    return count
+
+
+def runs_have_fonts(r_elements, latin: str, east_asia: str) -> bool:
+    """各 run 是否已带与 set_runs_fonts 写入值相同的 rFonts（写入将不改变 XML）。"""
+    tag_rPr = qn("w:rPr")
+    tag_rFonts = qn("w:rFonts")
+    attr_ascii = qn("w:ascii")
+    attr_hansi = qn("w:hAnsi")
+    attr_east = qn("w:eastAsia")
+    for r in r_elements:
+        rPr = r.find(tag_rPr)
+        rFonts = rPr.find(tag_rFonts) if rPr is not None else None
+        if rFonts is None or rFonts.get(attr_ascii) != latin or \
+                rFonts.get(attr_hansi) != latin or rFonts.get(attr_east) != east_asia:
+            return False
+    return True
+
+
 def set_style_fonts(style, latin: str, east_asia: str) -> None:
     style.font.name = latin
     rPr = style.element.rPr
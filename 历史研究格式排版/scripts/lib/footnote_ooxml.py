@@ -1,6 +1,10 @@
+import re
+import copy
 import zipfile
 import shutil
+from collections import defaultdict, deque
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
 from lxml import etree
 
 _NS = {
@@ -29,19 +33,31 @@ def set_footnote_restart_each_page(docx_path: str) -> None:
     tmp.unlink()
 
 
-def _patch_settings(xml_bytes: bytes) -> bytes:
-    root = etree.fromstring(xml_bytes)
-    ns_w = _W
+def apply_footnote_restart_each_page(settings_root) -> None:
+    """在已解析的 <w:settings> 根节点上就地写入 numRestart=eachPage。
 
-    fpr = root.find(_w("footnotePr"))
+    可直接作用于 python-docx 的 ``doc.settings.element``，在唯一一次
+    ``doc.save()`` 之前完成补丁，无需再次解压 / 重压整个 zip。
+    """
+    fpr = settings_root.find(_w("footnotePr"))
     if fpr is None:
-        fpr = etree.SubElement(root, _w("footnotePr"))
+        fpr = etree.SubElement(settings_root, _w("footnotePr"))
 
     nr = fpr.find(_w("numRestart"))
     if nr is None:
-        nr = etree.SubElement(fpr, _w("numRestart"))
+        nr = etree.Element(_w("numRestart"))
+        # CT_FtnDocProps 中 <w:footnote> 分隔符引用排在编号属性之后
+        first_ref = fpr.find(_w("footnote"))
+        if first_ref is None:
+            fpr.append(nr)
+        else:
+            first_ref.addprevious(nr)
     nr.set(_w("val"), "eachPage")
 
+
+def _patch_settings(xml_bytes: bytes) -> bytes:
+    root = etree.fromstring(xml_bytes)
+    apply_footnote_restart_each_page(root)
     return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
 
 
@@ -50,8 +66,12 @@ def has_footnote_restart_each_page(docx_path: str) -> bool:
         if "word/settings.xml" not in z.namelist():
             return False
         data = z.read("word/settings.xml")
-    root = etree.fromstring(data)
-    fpr = root.find(_w("footnotePr"))
+    return settings_has_footnote_restart(etree.fromstring(data))
+
+
+def settings_has_footnote_restart(settings_root) -> bool:
+    """在已解析的 <w:settings> 根节点上判断 numRestart 是否为 eachPage。"""
+    fpr = settings_root.find(_w("footnotePr"))
     if fpr is None:
         return False
     nr = fpr.find(_w("numRestart"))
@@ -63,3 +83,218 @@ def has_footnote_restart_each_page(docx_path: str) -> bool:
 def has_footnotes_part(docx_path: str) -> bool:
     with zipfile.ZipFile(docx_path, "r") as z:
         return "word/footnotes.xml" in z.namelist()
+
+
+# ────────────────────────── 文本脚注 → 真脚注 ──────────────────────────────────
+
+# 脚注段：以 [n] 或圈号开头；正文标记：[n] 或圈号
+_NOTE_RE = re.compile(r"^\s*(?:\[(\d+)\]|([\u2460-\u2473]))\s*")
+_MARKER_RE = re.compile(r"\[(\d+)\]|([\u2460-\u2473])")
+# 此标题之后的 [n] 段落是参考文献条目，不参与转换
+_REFERENCES_RE = re.compile(r"^\s*(参考文献|征引文献|References|Bibliography)\s*$", re.I)
+_CIRCLED_BASE = 0x2460 - 1
+
+_FOOTNOTES_XML = (
+    '<w:footnotes xmlns:w="%s" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<w:footnote w:type="separator" w:id="-1"><w:p><w:r><w:separator/></w:r></w:p></w:footnote>'
+    '<w:footnote w:type="continuationSeparator" w:id="0"><w:p><w:r><w:continuationSeparator/></w:r></w:p></w:footnote>'
+    '</w:footnotes>' % _W
+)
+
+
+def _note_number(m) -> int:
+    return int(m.group(1)) if m.group(1) else ord(m.group(2)) - _CIRCLED_BASE
+
+
+class _FootnotesPart:
+    """word/footnotes.xml 的 lxml 树：首次需要时加载或新建，结束时只序列化一次。"""
+
+    def __init__(self, doc):
+        self._doc = doc
+        self._part = None
+        self.root = None
+        self._next_id = 1
+
+    def allocate(self) -> int:
+        if self.root is None:
+            self._load()
+        fid = self._next_id
+        self._next_id += 1
+        return fid
+
+    def _load(self) -> None:
+        from docx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+        from docx.opc.packuri import PackURI
+        from docx.opc.part import Part
+        from docx.oxml import parse_xml
+
+        doc_part = self._doc.part
+        for rel in doc_part.rels.values():
+            if not rel.is_external and rel.reltype == RT.FOOTNOTES:
+                self._part = rel.target_part
+                self.root = parse_xml(self._part.blob)
+                break
+        else:
+            self.root = parse_xml(_FOOTNOTES_XML)
+            self._part = Part(PackURI("/word/footnotes.xml"), CT.WML_FOOTNOTES,
+                              b"", doc_part.package)
+            doc_part.relate_to(self._part, RT.FOOTNOTES)
+
+        # 编号只扫描一次，此后递增分配
+        ids = [int(f.get(_w("id"))) for f in self.root.iterchildren(_w("footnote"))]
+        self._next_id = max(ids + [0]) + 1
+
+    def save(self) -> None:
+        if self.root is None:
+            return
+        blob = etree.tostring(self.root, xml_declaration=True, encoding="UTF-8", standalone=True)
+        if hasattr(self._part, "_element"):
+            self._part._element = self.root  # 已被识别为 XmlPart 时
+        else:
+            self._part._blob = blob
+
+
+def _superscript_run(rPr_src, child):
+    from docx.oxml import OxmlElement
+
+    r = OxmlElement("w:r")
+    rPr = copy.deepcopy(rPr_src) if rPr_src is not None else OxmlElement("w:rPr")
+    rPr.get_or_add_vertAlign().set(_w("val"), "superscript")
+    r.append(rPr)
+    r.append(child)
+    return r
+
+
+def _text_run(rPr_src, text: str):
+    from docx.oxml import OxmlElement
+
+    r = OxmlElement("w:r")
+    if rPr_src is not None:
+        r.append(copy.deepcopy(rPr_src))
+    t = OxmlElement("w:t")
+    t.text = text
+    t.set("{http://www.w3.org/XML/1998/namespace}space", "preserve")
+    r.append(t)
+    return r
+
+
+def _make_footnote(p, fid: int, prefix_len: int):
+    """把脚注段落 p 移入新的 <w:footnote>：去掉 [n] 前缀，段首补 footnoteRef。"""
+    from docx.oxml import OxmlElement
+
+    remaining = prefix_len
+    for t in p.iter(_w("t")):
+        if remaining <= 0:
+            break
+        text = t.text or ""
+        cut = min(len(text), remaining)
+        t.text = text[cut:]
+        remaining -= cut
+
+    first_r = p.find(_w("r"))
+    rPr = first_r.find(_w("rPr")) if first_r is not None else None
+    pos = 1 if p.find(_w("pPr")) is not None else 0
+    p.insert(pos, _superscript_run(rPr, OxmlElement("w:footnoteRef")))
+    p.insert(pos + 1, _text_run(rPr, " "))
+
+    fn = OxmlElement("w:footnote")
+    fn.set(_w("id"), str(fid))
+    fn.append(p)
+    return fn
+
+
+def _replace_markers(t, markers: List[Tuple[int, int, int]]) -> None:
+    """把 w:t 中的若干 [n] 标记换成 footnoteReference run（按原顺序拆分所在 run）。"""
+    from docx.oxml import OxmlElement
+
+    r = t.getparent()
+    rPr = r.find(_w("rPr"))
+    text = t.text or ""
+    trailing = list(t.itersiblings())
+
+    new_runs = []
+    pos = 0
+    for start, end, fid in sorted(markers):
+        if start > pos and new_runs:
+            new_runs.append(_text_run(rPr, text[pos:start]))
+        elif not new_runs:
+            t.text = text[:start]
+        ref = OxmlElement("w:footnoteReference")
+        ref.set(_w("id"), str(fid))
+        new_runs.append(_superscript_run(rPr, ref))
+        pos = end
+    if pos < len(text):
+        new_runs.append(_text_run(rPr, text[pos:]))
+    if trailing:
+        # 原 run 中位于该 w:t 之后的内容随新 run 后移，保持阅读顺序
+        tail = OxmlElement("w:r")
+        if rPr is not None:
+            tail.append(copy.deepcopy(rPr))
+        for child in trailing:
+            tail.append(child)
+        new_runs.append(tail)
+
+    anchor = r
+    for run in new_runs:
+        anchor.addnext(run)
+        anchor = run
+    if not t.text:
+        # 标记位于文本开头：不留空 w:t，原 run 只剩属性时一并删除
+        r.remove(t)
+        if all(child.tag == _w("rPr") for child in r):
+            r.getparent().remove(r)
+
+
+def convert_text_footnotes(doc, on_note: Optional[Callable] = None) -> Dict[str, int]:
+    """把正文中的 [n] / 圈号标记与其后的同号脚注段落转换为 word/footnotes.xml 中的真脚注。
+
+    单次遍历正文段落：遇到标记按号码入队（FIFO），遇到同号脚注段落时与最早的待配对
+    标记配对并分配编号；「参考文献」标题之后的段落不参与。所有 run 拆分在遍历结束后
+    按 w:t 分组一次完成，footnotes.xml 只序列化一次。
+    on_note 会以每个移入脚注的 <w:p> 调用，供调用方套用脚注样式与字体。
+
+    返回 {"converted", "unmatched_markers", "unmatched_notes"}。
+    """
+    body = doc.element.body
+    part = _FootnotesPart(doc)
+    pending: Dict[int, deque] = defaultdict(deque)
+    resolved: Dict[object, List[Tuple[int, int, int]]] = {}
+    converted = unmatched_notes = 0
+
+    for p in list(body.iterchildren(_w("p"))):
+        texts = list(p.iter(_w("t")))
+        text = "".join(t.text or "" for t in texts)
+        if _REFERENCES_RE.match(text):
+            break
+
+        m = _NOTE_RE.match(text)
+        if m is not None:
+            queue = pending.get(_note_number(m))
+            if queue:
+                t, start, end = queue.popleft()
+                fid = part.allocate()
+                resolved.setdefault(t, []).append((start, end, fid))
+                part.root.append(_make_footnote(p, fid, m.end()))
+                if on_note is not None:
+                    on_note(p)
+                converted += 1
+            else:
+                unmatched_notes += 1
+            continue
+
+        for t in texts:
+            if not t.text:
+                continue
+            for mm in _MARKER_RE.finditer(t.text):
+                pending[_note_number(mm)].append((t, mm.start(), mm.end()))
+
+    for t, markers in resolved.items():
+        _replace_markers(t, markers)
+    part.save()
+
+    return {
+        "converted": converted,
+        "unmatched_markers": sum(len(q) for q in pending.values()),
+        "unmatched_notes": unmatched_notes,
+    }
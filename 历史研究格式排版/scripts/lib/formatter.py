@@ -0,0 +1,292 @@
+from pathlib import Path
+from typing import Optional
+
+from docx import Document
+from docx.oxml.ns import qn
+
+from .specs import DEFAULT_SPEC, STYLE_NAMES
+from .io_utils import backup_input
+from .batch import collect_docx, run_pool
+from .cache import ResultCache
+from .incremental import load_state, save_state, paragraph_digest
+from .style_factory import (
+    ensure_paragraph_styles, apply_base_page_setup, get_style_index,
+)
+from .font_utils import runs_have_fonts, set_runs_fonts, set_style_fonts
+from .paragraph_rules import classify_text, classify_style
+from .stories import document_stories, BODY, TABLE, TEXTBOX, NOTE_CONTEXTS
+from .footnote_ooxml import (
+    apply_footnote_restart_each_page, convert_text_footnotes,
+)
+from .profiling import StageProfiler, NULL_PROFILER, write_profile
+
+
+# ── 样式名 → 东亚字体映射 ────────────────────────────────────────────────────
+_STYLE_EAST_FONT: dict[str, str] = {
+    STYLE_NAMES["body"]:           DEFAULT_SPEC.font_body_east,
+    STYLE_NAMES["quote"]:          DEFAULT_SPEC.font_quote_east,
+    STYLE_NAMES["footnote"]:       DEFAULT_SPEC.font_footnote_east,
+    STYLE_NAMES["title_main"]:     DEFAULT_SPEC.font_title_east,
+    STYLE_NAMES["subtitle"]:       DEFAULT_SPEC.font_subtitle_east,
+    STYLE_NAMES["abstract_label"]: DEFAULT_SPEC.font_abstract_label_east,
+    STYLE_NAMES["abstract_text"]:  DEFAULT_SPEC.font_abstract_text_east,
+    STYLE_NAMES["section_l2"]:     DEFAULT_SPEC.font_section_l2_east,
+}
+
+
+def _apply_style_level_fonts(doc) -> None:
+    """在命名样式层面设置拉丁 + 东亚字体，为所有段落提供继承基础。"""
+    latin = DEFAULT_SPEC.font_latin
+    styles = get_style_index(doc)
+    for style_name, east in _STYLE_EAST_FONT.items():
+        style = styles.get(style_name)
+        if style is not None:
+            set_style_fonts(style, latin, east)
+
+
+def _process_paragraphs(doc, state=None) -> dict:
+    """单次遍历全部故事部件：分类、应用段落样式，并趁元素在手直写 run 层字体。
+
+    覆盖正文（含嵌套表格与文本框）、页眉页脚、脚注与尾注，规则按段落上下文区分：
+    - 正文顶层段落：文本 + 样式名完整分类
+    - 表格单元格 / 文本框：只按现有样式名归类（数字单元格会误中标题、脚注的文本规则）
+    - 页眉 / 页脚：保留原样式，只写字体
+    - 脚注 / 尾注：统一脚注样式与字体
+
+    run 层直写确保中西文分离不被旧 run 属性覆盖；东亚字体按 style_id 缓存。
+    传入 ParagraphState 时为增量模式：哈希与上次输出一致的段落直接跳过
+    （排版是幂等的，重做只会得到相同结果），全部处理完后记录每段排版后的哈希
+    （文本框段落嵌在外层段落内，须等内层排完再取外层哈希）。
+    返回各上下文处理的段落数。
+    """
+    latin = DEFAULT_SPEC.font_latin
+    styles = get_style_index(doc)
+    east_by_id: dict = {}
+    note = styles.get(STYLE_NAMES["footnote"])
+    note_style_id = note.style_id if note is not None else None
+    note_east = DEFAULT_SPEC.font_footnote_east
+    counts: dict = {}
+    formatted = []
+
+    for story in document_stories(doc):
+        for context, p in story.paragraphs():
+            if state is not None:
+                # 同一段落在不同上下文中排版结果不同，非正文段落的哈希带上下文前缀
+                digest = paragraph_digest(p)
+                if context != BODY:
+                    digest = f"{context}:{digest}"
+                if state.is_unchanged(digest):
+                    state.record(digest, skipped=True)
+                    continue
+            counts[context] = counts.get(context, 0) + 1
+
+            if context in NOTE_CONTEXTS:
+                # 脚注部件需整体重新序列化，只在段落确有改动时标记
+                if note_style_id is not None and p.style != note_style_id:
+                    p.style = note_style_id
+                    story.dirty = True
+                r_lst = p.r_lst
+                if not runs_have_fonts(r_lst, latin, note_east):
+                    set_runs_fonts(r_lst, latin, note_east)
+                    story.dirty = True
+                formatted.append((context, p))
+                continue
+
+            current = styles.paragraph_style_name(p.style)
+            if context == BODY:
+                style_name = classify_text(p.text, current)
+            elif context in (TABLE, TEXTBOX):
+                style_name = classify_style(current)
+            else:
+                style_name = None
+            if style_name is not None:
+                try:
+                    p.style = styles.paragraph_style_id(style_name)
+                except (KeyError, ValueError):
+                    # 样式缺失或同名样式不是段落样式：保留段落原样式
+                    pass
+
+            style_id = p.style
+            east = east_by_id.get(style_id)
+            if east is None:
+                east = _STYLE_EAST_FONT.get(
+                    styles.paragraph_style_name(style_id), DEFAULT_SPEC.font_body_east
+                )
+                east_by_id[style_id] = east
+            set_runs_fonts(p.r_lst, latin, east)
+            formatted.append((context, p))
+            story.dirty = True
+        story.commit()
+
+    if state is not None:
+        for context, p in formatted:
+            digest = paragraph_digest(p)
+            state.record(digest if context == BODY else f"{context}:{digest}")
+    return counts
+
+
+def _convert_footnotes(doc) -> int:
+    """文本脚注转真脚注；移入 footnotes.xml 的段落统一套用脚注样式与字体。"""
+    latin = DEFAULT_SPEC.font_latin
+    east = DEFAULT_SPEC.font_footnote_east
+    style = get_style_index(doc).get(STYLE_NAMES["footnote"])
+    style_id = style.style_id if style is not None else None
+
+    def format_note(p) -> None:
+        if style_id is not None:
+            p.style = style_id
+        set_runs_fonts(p.r_lst, latin, east)
+
+    stats = convert_text_footnotes(doc, format_note)
+    if stats["unmatched_markers"] or stats["unmatched_notes"]:
+        print(f"[脚注] 转换 {stats['converted']} 条；未配对标记 "
+              f"{stats['unmatched_markers']} 个，未配对脚注段 {stats['unmatched_notes']} 个")
+    return stats["converted"]
+
+
+def _document_counts(doc) -> dict:
+    """正文段落数、run 数与表格数（含嵌套），仅在分析模式下统计。"""
+    body = doc.element.body
+    return {
+        "paragraphs": sum(1 for _ in body.iter(qn("w:p"))),
+        "runs": sum(1 for _ in body.iter(qn("w:r"))),
+        "tables": sum(1 for _ in body.iter(qn("w:tbl"))),
+    }
+
+
+def format_document(input_path: Path, output_path: Path,
+                    incremental: bool = False,
+                    real_footnotes: bool = False,
+                    profiler=None) -> None:
+    """执行完整排版流程。
+
+    incremental=True 时读取输入中上次排版留下的段落哈希，只重排有改动的段落，
+    并把本次结果的哈希写回输出文档的 customXml 部件。
+    real_footnotes=True 时把正文中的 [n] 标记与文本脚注段落转换为 Word 真脚注。
+    传入 lib.profiling.StageProfiler 时记录各阶段耗时、峰值内存与段落 / run 数。
+    """
+    prof = profiler or NULL_PROFILER
+
+    with prof.stage("load"):
+        doc = Document(str(input_path))
+        state = load_state(doc) if incremental else None
+    if prof.enabled:
+        prof.count(**_document_counts(doc))
+
+    # 1. 页面设置（边距）
+    with prof.stage("page_setup"):
+        apply_base_page_setup(doc)
+
+    # 2. 注册 / 确保 8 个命名样式存在
+    with prof.stage("styles"):
+        ensure_paragraph_styles(doc)
+
+    # 3. 样式层字体（继承基础）
+    with prof.stage("style_fonts"):
+        _apply_style_level_fonts(doc)
+
+    # 4. 段落分类 + 样式应用 + run 层字体（正文 / 表格 / 文本框 / 页眉页脚 / 脚注单次遍历；
+    #    增量模式跳过未变段落）
+    with prof.stage("paragraphs"):
+        story_counts = _process_paragraphs(doc, state)
+    prof.count(**{f"{context}_paragraphs": n for context, n in story_counts.items()})
+    if state is not None:
+        prof.count(skipped_paragraphs=state.skipped)
+
+    # 4b. 文本脚注 → 真脚注（脚注段整段移入 footnotes.xml，正文标记换成 footnoteReference）
+    if real_footnotes:
+        with prof.stage("real_footnotes"):
+            converted = _convert_footnotes(doc)
+        prof.count(footnotes_converted=converted)
+
+    # 5. 脚注每页重排（内存中直改 settings.xml，随唯一一次 save 写出）
+    with prof.stage("footnote_restart"):
+        apply_footnote_restart_each_page(doc.settings.element)
+
+    if state is not None:
+        with prof.stage("incremental_state"):
+            save_state(doc, state)
+
+    # 6. 保存
+    with prof.stage("save"):
+        doc.save(str(output_path))
+
+
+def format_cached(input_path: Path, output_path: Path, cache=None,
+                  incremental: bool = False, real_footnotes: bool = False,
+                  profiler=None) -> bool:
+    """带内容哈希缓存的排版；命中时直接复制缓存输出，返回是否命中。"""
+    if profiler is not None:
+        profiler.file = str(input_path)
+    if cache is None:
+        format_document(input_path, output_path, incremental, real_footnotes, profiler)
+        return False
+
+    kind = "format-incremental" if incremental else "format"
+    if real_footnotes:
+        kind += "-real-footnotes"
+    key = cache.key(kind, input_path)
+    if cache.get_file(key, output_path):
+        if profiler is not None:
+            profiler.cache_hit = True
+        return True
+    format_document(input_path, output_path, incremental, real_footnotes, profiler)
+    cache.put_file(key, output_path)
+    return False
+
+
+def _format_worker(input_path: Path, output_path: Path, backup: bool,
+                   use_cache: bool = True, incremental: bool = False,
+                   real_footnotes: bool = False, profile: bool = False,
+                   cprofile: bool = False) -> tuple:
+    """批量模式的单文件任务；异常在此捕获，保证坏文件不中断整批。
+
+    返回 (状态, 输入路径, 说明, 分析结果或 None)。
+    """
+    profiler = StageProfiler(cprofile) if profile else None
+    try:
+        if backup:
+            backup_input(input_path)
+        hit = format_cached(input_path, output_path,
+                            ResultCache() if use_cache else None, incremental,
+                            real_footnotes, profiler)
+    except Exception as exc:  # noqa: BLE001 — 任何异常都只记为该文件失败
+        return ("FAIL", str(input_path), f"{type(exc).__name__}: {exc}", None)
+    detail = str(output_path) + ("（缓存命中）" if hit else "")
+    return ("OK", str(input_path), detail,
+            profiler.to_dict() if profiler is not None else None)
+
+
+def format_batch(input_dir: Path, output_dir: Path, jobs: int,
+                 backup: bool = True, use_cache: bool = True,
+                 incremental: bool = False, real_footnotes: bool = False,
+                 profile_path: Optional[Path] = None, cprofile: bool = False) -> int:
+    """并行排版目录下全部 .docx，逐个输出结果，返回失败文件数。
+
+    给出 profile_path 时把逐文件分析结果与整批汇总写入该 JSON。
+    """
+    files = collect_docx(input_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    profile = profile_path is not None
+    tasks = [(f, output_dir / f.name, backup, use_cache, incremental, real_footnotes,
+              profile, cprofile)
+             for f in files]
+
+    print(f"[批量] {len(files)} 个文件  jobs={jobs}  {input_dir} → {output_dir}")
+    fail_count = 0
+    profiles = []
+    for status, src, detail, prof in run_pool(_format_worker, tasks, jobs):
+        if prof is not None:
+            profiles.append(prof)
+        if status == "OK":
+            print(f"[完成] {src} → {detail}", flush=True)
+        else:
+            fail_count += 1
+            print(f"[失败] {src}  {detail}", flush=True)
+
+    print(f"结果: {len(files) - fail_count}/{len(files)} 成功  {fail_count} 失败")
+    if profile:
+        profiles.sort(key=lambda p: p["file"])
+        write_profile(profile_path, profiles)
+        print(f"[分析] {profile_path}")
+    return fail_count
@@ -0,0 +1,87 @@
+import hashlib
+import re
+
+from lxml import etree
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.opc.part import Part
+
+from .cache import spec_fingerprint
+
+STATE_NS = "urn:hr-format:state"
+STATE_VERSION = "1"
+_STATE_PARTNAME = "/customXml/hrFormatState.xml"
+_STATE_CONTENT_TYPE = "application/xml"
+
+# Word 另存时会为段落补写 / 刷新这些属性，它们不代表内容变化
+_VOLATILE_ATTR_RE = re.compile(rb'\s(?:w14:paraId|w14:textId|w:rsid\w*)="[^"]*"')
+
+
+def _s(tag: str) -> str:
+    return f"{{{STATE_NS}}}{tag}"
+
+
+def paragraph_digest(p) -> str:
+    """段落内容哈希：覆盖文本、段落属性与 run 属性，忽略 rsid / paraId。"""
+    xml = etree.tostring(p, method="c14n", exclusive=True)
+    xml = _VOLATILE_ATTR_RE.sub(b"", xml)
+    return hashlib.blake2b(xml, digest_size=12).hexdigest()
+
+
+class ParagraphState:
+    """上次排版输出中各段落的哈希集合，及本次排版后待写回的哈希。"""
+
+    def __init__(self, known=None):
+        self.known: frozenset = frozenset(known or ())
+        self.digests: list = []
+        self.skipped = 0
+
+    def is_unchanged(self, digest: str) -> bool:
+        return digest in self.known
+
+    def record(self, digest: str, skipped: bool = False) -> None:
+        self.digests.append(digest)
+        if skipped:
+            self.skipped += 1
+
+
+def _find_state_part(doc):
+    for rel in doc.part.rels.values():
+        if rel.is_external or rel.reltype != RT.CUSTOM_XML:
+            continue
+        part = rel.target_part
+        try:
+            root = etree.fromstring(part.blob)
+        except etree.XMLSyntaxError:
+            continue
+        if root.tag == _s("formatState"):
+            return part, root
+    return None, None
+
+
+def load_state(doc) -> ParagraphState:
+    """读取文档内保存的排版状态；不存在或规格指纹不符时返回空状态（全量排版）。"""
+    _, root = _find_state_part(doc)
+    if root is None:
+        return ParagraphState()
+    if root.get("version") != STATE_VERSION or root.get("spec") != spec_fingerprint():
+        return ParagraphState()
+    paras = root.find(_s("paragraphs"))
+    text = paras.text if paras is not None else ""
+    return ParagraphState((text or "").split())
+
+
+def save_state(doc, state: ParagraphState) -> None:
+    """将本次排版后的段落哈希写入 customXml 部件（已存在则原地更新）。"""
+    root = etree.Element(_s("formatState"), nsmap={"hr": STATE_NS})
+    root.set("version", STATE_VERSION)
+    root.set("spec", spec_fingerprint())
+    etree.SubElement(root, _s("paragraphs")).text = " ".join(sorted(set(state.digests)))
+    blob = etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+    part, _ = _find_state_part(doc)
+    if part is not None:
+        part._blob = blob
+        return
+    part = Part(PackURI(_STATE_PARTNAME), _STATE_CONTENT_TYPE, blob, doc.part.package)
+    doc.part.relate_to(part, RT.CUSTOM_XML)
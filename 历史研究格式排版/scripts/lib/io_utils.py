@@ -24,3 +24,11 @@ def backup_input(input_path: Path) -> Path:
     backup = input_path.with_suffix(".bak.docx")
     shutil.copy2(input_path, backup)
     return backup
+
+
+def resolve_input_dir(path: str) -> Path:
+    p = Path(path)
+    if not p.is_dir():
+        print(f"ERROR: 输入目录不存在: {path}", file=sys.stderr)
+        sys.exit(1)
+    return p
@@ -1,4 +1,6 @@
 import re
+from functools import lru_cache
+from typing import Optional
 from .specs import STYLE_NAMES
 
 
@@ -10,14 +12,26 @@ _ABSTRACT_LABEL_RE = re.compile(r"^(摘\s*要|关\s*键\s*词)\s*[：:]")
 _ABSTRACT_TEXT_RE = re.compile(r"^(摘\s*要|关\s*键\s*词)")
 _FOOTNOTE_RE = re.compile(r"^\[?\d+\]?\s")
 
+# 文本规则按优先级合并为一条带命名分组的交替式：re 从左到右尝试各分支，
+# 首个命中的分支即结果，与逐条 match 的顺序判定等价，但每段只扫描一次。
+_TEXT_RULES = (
+    ("abstract_label", _ABSTRACT_LABEL_RE),
+    ("abstract_text", _ABSTRACT_TEXT_RE),
+    ("section_l2", _SECTION_L2_RE),
+    ("footnote", _FOOTNOTE_RE),
+)
+_TEXT_RULE_RE = re.compile(
+    "|".join(f"(?P<{key}>{rx.pattern})" for key, rx in _TEXT_RULES)
+)
+_TEXT_RULE_KEYS = tuple(key for key, _ in _TEXT_RULES)
+
+_HR_STYLE_NAMES = frozenset(STYLE_NAMES.values())
 
-def classify_paragraph(paragraph) -> str:
-    text = paragraph.text.strip()
-    if not text:
-        return STYLE_NAMES["body"]
 
-    existing = paragraph.style.name if paragraph.style else ""
-    if existing in STYLE_NAMES.values():
+@lru_cache(maxsize=None)
+def _classify_style(existing: str) -> Optional[str]:
+    """仅凭现有样式名可确定的分类；结果按样式名缓存。"""
+    if existing in _HR_STYLE_NAMES:
         return existing
 
     if existing in ("Heading 1", "Title"):
@@ -30,19 +44,81 @@ def classify_paragraph(paragraph) -> str:
         return STYLE_NAMES["quote"]
     if "Footnote" in existing:
         return STYLE_NAMES["footnote"]
+    return None
 
-    if _ABSTRACT_LABEL_RE.match(text):
-        return STYLE_NAMES["abstract_label"]
-    if _ABSTRACT_TEXT_RE.match(text):
-        return STYLE_NAMES["abstract_text"]
-    if _SECTION_L2_RE.match(text):
-        return STYLE_NAMES["section_l2"]
-    if _FOOTNOTE_RE.match(text):
-        return STYLE_NAMES["footnote"]
 
+def classify_style(style_name: str) -> Optional[str]:
+    """只按现有样式名分类（标题 / 引文 / 脚注样式）；无法判定时返回 None。
+
+    供表格单元格、文本框等不适用正文文本规则的段落使用。
+    """
+    return _classify_style(style_name or "")
+
+
+def classify_text(text: str, style_name: str = "") -> str:
+    """按段落纯文本与现有样式名分类，不依赖 python-docx 对象。"""
+    text = text.strip()
+    if not text:
+        return STYLE_NAMES["body"]
+
+    by_style = _classify_style(style_name or "")
+    if by_style is not None:
+        return by_style
+
+    m = _TEXT_RULE_RE.match(text)
+    if m is None:
+        return STYLE_NAMES["body"]
+    for key in _TEXT_RULE_KEYS:
+        if m.group(key) is not None:
+            return STYLE_NAMES[key]
     return STYLE_NAMES["body"]
 
 
+def classify_paragraph(paragraph, style_name: Optional[str] = None) -> str:
+    """返回段落应使用的 HR- 样式名。
+
+    style_name 为段落当前样式名；调用方已解析过时传入，可省去逐段的样式查找。
+    """
+    text = paragraph.text
+    if not text.strip():
+        return STYLE_NAMES["body"]
+
+    if style_name is None:
+        existing = paragraph.style.name if paragraph.style else ""
+    else:
+        existing = style_name
+    return classify_text(text, existing)
+
+
+def classify_many(paragraphs) -> list:
+    """批量分类，返回与输入等长的 HR- 样式名列表，供 QA 面板等外部调用方对整批语料预分类。
+
+    元素可以是 python-docx 段落、``(text, style_name)`` 元组或纯文本字符串，
+    因此可对抽取出的语料直接分类，而无需构建 Document。段落的样式名按
+    (文档部件, style_id) 缓存，整批每种样式只解析一次；结果与逐段 classify_paragraph 一致。
+    """
+    labels = []
+    names: dict = {}
+    for item in paragraphs:
+        if isinstance(item, str):
+            text, existing = item, ""
+        elif isinstance(item, tuple):
+            text, existing = item
+        else:
+            text = item.text
+            key = (item.part, item._p.style)
+            existing = names.get(key)
+            if existing is None:
+                existing = names[key] = item.style.name if item.style else ""
+        if not text.strip():
+            labels.append(STYLE_NAMES["body"])
+            continue
+        # 样式名可定的先走缓存的 _classify_style，其余才做文本匹配
+        by_style = _classify_style(existing or "")
+        labels.append(by_style if by_style is not None else classify_text(text, existing))
+    return labels
+
+
 def apply_paragraph_style(paragraph, style_name: str) -> None:
     try:
         paragraph.style = style_name
@@ -0,0 +1,154 @@
+import cProfile
+import json
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows 无 resource 模块，峰值内存记为 None
+    resource = None
+
+PROFILE_VERSION = 1
+CPROFILE_TOP = 30
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程自启动以来的峰值常驻内存（MB）；进程池中为该工作进程的历史峰值。"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 计，macOS 以字节计
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class StageProfiler:
+    """记录单个文档排版各阶段的耗时与内存，可选附带 cProfile 热点函数。
+
+    用法：
+        profiler = StageProfiler()
+        format_document(src, dst, profiler=profiler)
+        profiler.to_dict()
+    """
+
+    enabled = True
+
+    def __init__(self, cprofile: bool = False):
+        self.stages: list = []
+        self.counts: dict = {}
+        self.file: Optional[str] = None
+        self.cache_hit = False
+        self._profile = cProfile.Profile() if cprofile else None
+        self._start = None
+        self._total = 0.0
+
+    @contextmanager
+    def stage(self, name: str):
+        if self._start is None:
+            self._start = time.perf_counter()
+        if self._profile is not None:
+            self._profile.enable()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            if self._profile is not None:
+                self._profile.disable()
+            self._total = time.perf_counter() - self._start
+            self.stages.append({
+                "name": name,
+                "seconds": round(elapsed, 6),
+                "peak_rss_mb": peak_rss_mb(),
+            })
+
+    def count(self, **counts) -> None:
+        self.counts.update(counts)
+
+    def _hotspots(self) -> list:
+        stats = pstats.Stats(self._profile)
+        rows = []
+        for (filename, line, func), (_cc, ncalls, tottime, cumtime, _callers) in stats.stats.items():
+            rows.append({
+                "function": f"{Path(filename).name}:{line}({func})",
+                "ncalls": ncalls,
+                "tottime": round(tottime, 6),
+                "cumtime": round(cumtime, 6),
+            })
+        rows.sort(key=lambda r: r["cumtime"], reverse=True)
+        return rows[:CPROFILE_TOP]
+
+    def to_dict(self) -> dict:
+        data = {
+            "file": self.file,
+            "cache_hit": self.cache_hit,
+            "total_seconds": round(self._total, 6),
+            "peak_rss_mb": peak_rss_mb(),
+            "counts": self.counts,
+            "stages": self.stages,
+        }
+        if self._profile is not None and self.stages:
+            data["cprofile"] = self._hotspots()
+        return data
+
+
+class _NullProfiler:
+    """未开启分析时的占位对象，各钩子均为空操作。"""
+
+    enabled = False
+
+    @contextmanager
+    def stage(self, name: str):
+        yield
+
+    def count(self, **counts) -> None:
+        pass
+
+
+NULL_PROFILER = _NullProfiler()
+
+
+def aggregate(profiles: list) -> dict:
+    """汇总多个文档的分析结果：各阶段总耗时 / 占比 / 最大值，及计数之和。"""
+    stages: dict = {}
+    counts: dict = {}
+    measured = [p for p in profiles if not p.get("cache_hit")]
+    for profile in measured:
+        for s in profile["stages"]:
+            agg = stages.setdefault(s["name"], {"name": s["name"], "seconds": 0.0,
+                                                "max_seconds": 0.0, "files": 0})
+            agg["seconds"] += s["seconds"]
+            agg["max_seconds"] = max(agg["max_seconds"], s["seconds"])
+            agg["files"] += 1
+        for key, value in profile["counts"].items():
+            counts[key] = counts.get(key, 0) + value
+
+    total = sum(s["seconds"] for s in stages.values())
+    ordered = sorted(stages.values(), key=lambda s: s["seconds"], reverse=True)
+    for s in ordered:
+        s["share"] = round(s["seconds"] / total, 4) if total else 0.0
+        s["seconds"] = round(s["seconds"], 6)
+    rss = [p["peak_rss_mb"] for p in profiles if p.get("peak_rss_mb") is not None]
+    return {
+        "files": len(profiles),
+        "cache_hits": len(profiles) - len(measured),
+        "total_seconds": round(total, 6),
+        "peak_rss_mb": max(rss) if rss else None,
+        "counts": counts,
+        "stages": ordered,
+    }
+
+
+def write_profile(path: Path, profiles: list) -> None:
+    """把逐文件结果与汇总写成 JSON。"""
+    payload = {
+        "version": PROFILE_VERSION,
+        "files": profiles,
+        "aggregate": aggregate(profiles),
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
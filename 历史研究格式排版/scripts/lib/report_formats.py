@@ -0,0 +1,68 @@
+import json
+import xml.etree.ElementTree as ET
+
+PASS = "PASS"
+FAIL = "FAIL"
+WARN = "WARN"
+ERROR = "ERROR"
+
+
+def file_status(results, error: str = "", strict: bool = False) -> str:
+    """单个文件的总体状态：ERROR / FAIL / PASS（strict 时 WARN 亦记 FAIL）。"""
+    if error or results is None:
+        return ERROR
+    bad = {FAIL, WARN} if strict else {FAIL}
+    return FAIL if any(r[0] in bad for r in results) else PASS
+
+
+def to_record(path: str, results, error: str = "", strict: bool = False) -> dict:
+    """将 validate() 的 (status, name, detail) 元组列表转成可序列化的记录。"""
+    results = results or []
+    return {
+        "path": path,
+        "status": file_status(results if not error else None, error, strict),
+        "passed": sum(1 for r in results if r[0] == PASS),
+        "failed": sum(1 for r in results if r[0] == FAIL),
+        "warnings": sum(1 for r in results if r[0] == WARN),
+        "error": error,
+        "results": [
+            {"status": status, "name": name, "detail": detail}
+            for status, name, detail in results
+        ],
+    }
+
+
+def jsonl_line(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False)
+
+
+def junit_xml(records: list, strict: bool = False) -> str:
+    """生成 JUnit XML：每个文件一个 testsuite，每条规则一个 testcase。"""
+    suites = ET.Element("testsuites", name="validate_docx")
+    total = failures = errors = 0
+    for rec in sorted(records, key=lambda r: r["path"]):
+        suite = ET.SubElement(suites, "testsuite", name=rec["path"])
+        s_tests = s_fail = s_err = 0
+        if rec["error"]:
+            case = ET.SubElement(suite, "testcase", classname=rec["path"], name="load")
+            ET.SubElement(case, "error", message=rec["error"])
+            s_tests, s_err = 1, 1
+        for r in rec["results"]:
+            case = ET.SubElement(suite, "testcase", classname=rec["path"], name=r["name"])
+            s_tests += 1
+            if r["status"] == FAIL or (strict and r["status"] == WARN):
+                ET.SubElement(case, "failure", message=r["detail"] or r["status"])
+                s_fail += 1
+            elif r["status"] == WARN:
+                ET.SubElement(case, "system-out").text = f"WARN: {r['detail']}"
+        suite.set("tests", str(s_tests))
+        suite.set("failures", str(s_fail))
+        suite.set("errors", str(s_err))
+        total += s_tests
+        failures += s_fail
+        errors += s_err
+    suites.set("tests", str(total))
+    suites.set("failures", str(failures))
+    suites.set("errors", str(errors))
+    ET.indent(suites)
+    return ET.tostring(suites, encoding="unicode", xml_declaration=True) + "\n"
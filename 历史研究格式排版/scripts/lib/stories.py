@@ -0,0 +1,96 @@
+from typing import List, Tuple
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn
+from lxml import etree
+
+# 段落所处的上下文：正文顶层、表格单元格、文本框、页眉、页脚、脚注、尾注
+BODY = "body"
+TABLE = "table"
+TEXTBOX = "textbox"
+HEADER = "header"
+FOOTER = "footer"
+FOOTNOTE = "footnote"
+ENDNOTE = "endnote"
+
+NOTE_CONTEXTS = frozenset((FOOTNOTE, ENDNOTE))
+
+_P = qn("w:p")
+_TBL = qn("w:tbl")
+_TXBX = qn("w:txbxContent")
+_TYPE = qn("w:type")
+
+# 文档部件关系 → 故事类型；footnotes / endnotes 在 python-docx 中是未解析的通用 Part
+_STORY_RELS = {
+    RT.HEADER: HEADER,
+    RT.FOOTER: FOOTER,
+    RT.FOOTNOTES: FOOTNOTE,
+    RT.ENDNOTES: ENDNOTE,
+}
+_NOTE_TAGS = {FOOTNOTE: qn("w:footnote"), ENDNOTE: qn("w:endnote")}
+
+
+class Story:
+    """一个文本部件（正文 / 页眉 / 页脚 / 脚注 / 尾注）及其已解析的根元素。
+
+    未被 python-docx 解析的部件（脚注、尾注）在此解析一次，改动段落后置 ``dirty``，
+    由 ``commit`` 序列化一次写回，未改动的部件保留原字节；页眉页脚与正文直接改
+    python-docx 持有的元素树。
+    """
+
+    def __init__(self, kind: str, root, part=None):
+        self.kind = kind
+        self.root = root
+        self._part = part
+        self.dirty = False
+
+    def paragraphs(self) -> List[Tuple[str, object]]:
+        """按文档顺序返回 (上下文, <w:p>)，嵌套表格与文本框内的段落各出现一次。"""
+        if self.kind in NOTE_CONTEXTS:
+            # 跳过分隔符等带 w:type 的系统脚注
+            notes = (n for n in self.root.iterchildren(_NOTE_TAGS[self.kind])
+                     if n.get(_TYPE) is None)
+            return [(self.kind, p) for n in notes for p in n.iter(_P)]
+        if self.kind != BODY:
+            return [(self.kind, p) for p in self.root.iter(_P)]
+
+        # 正文：单次 iterwalk，只在段落 / 表格 / 文本框边界回到 Python，
+        # 用栈记录最内层容器，不构建 Table / _Cell 代理
+        result = []
+        context = [BODY]
+        for event, el in etree.iterwalk(self.root, events=("start", "end"),
+                                        tag=(_P, _TBL, _TXBX)):
+            if el.tag == _P:
+                if event == "start":
+                    result.append((context[-1], el))
+            elif event == "start":
+                context.append(TABLE if el.tag == _TBL else TEXTBOX)
+            else:
+                context.pop()
+        return result
+
+    def commit(self) -> None:
+        if self._part is not None and self.dirty:
+            self._part._blob = etree.tostring(self.root, xml_declaration=True,
+                                              encoding="UTF-8", standalone=True)
+
+
+def document_stories(doc) -> List[Story]:
+    """正文及文档部件引用的全部页眉、页脚、脚注、尾注；同一部件只返回一次。"""
+    stories = [Story(BODY, doc.element.body)]
+    seen = set()
+    for rel in doc.part.rels.values():
+        kind = _STORY_RELS.get(rel.reltype)
+        if kind is None or rel.is_external:
+            continue
+        part = rel.target_part
+        if id(part) in seen:
+            continue
+        seen.add(id(part))
+        element = getattr(part, "element", None)
+        if element is not None:
+            stories.append(Story(kind, element))
+        else:
+            stories.append(Story(kind, parse_xml(part.blob), part))
+    return stories
@@ -5,10 +5,81 @@ from docx.enum.style import WD_STYLE_TYPE
 from .specs import LayoutSpec, DEFAULT_SPEC, STYLE_NAMES
 
 
+class StyleIndex:
+    """样式名 → 样式对象索引。
+
+    构建时遍历一次 styles.xml，之后查找为 O(1)；通过 ``add_style`` 新增的样式
+    同步写入索引。同名样式保留第一个，与 ``doc.styles[name]`` 的行为一致。
+    """
+
+    def __init__(self, doc):
+        self._styles = doc.styles
+        self._by_name: dict = {}
+        self._para_name_by_id: dict = {}
+        for style in self._styles:
+            self._by_name.setdefault(style.name, style)
+            if style.type == WD_STYLE_TYPE.PARAGRAPH:
+                self._para_name_by_id.setdefault(style.style_id, style.name or "")
+        default = self._styles.default(WD_STYLE_TYPE.PARAGRAPH)
+        self._default_para = default
+        self._default_para_name = (default.name or "") if default is not None else ""
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def __getitem__(self, name: str):
+        return self._by_name[name]
+
+    def get(self, name: str, default=None):
+        return self._by_name.get(name, default)
+
+    def names(self) -> set:
+        return set(self._by_name)
+
+    def add_style(self, name: str, style_type=WD_STYLE_TYPE.PARAGRAPH):
+        style = self._styles.add_style(name, style_type)
+        self._by_name[name] = style
+        if style_type == WD_STYLE_TYPE.PARAGRAPH:
+            self._para_name_by_id.setdefault(style.style_id, name)
+        return style
+
+    def paragraph_style_name(self, style_id) -> str:
+        """段落 pStyle 值 → 样式名；未定义或缺省时返回默认段落样式名。"""
+        if style_id is None:
+            return self._default_para_name
+        return self._para_name_by_id.get(style_id, self._default_para_name)
+
+    def paragraph_style_id(self, name: str):
+        """样式名 → 写入 pStyle 的 style_id，语义同 ``Styles.get_style_id``。
+
+        样式不存在时抛 KeyError；为默认段落样式时返回 None。
+        """
+        style = self._by_name[name]
+        if style.type != WD_STYLE_TYPE.PARAGRAPH:
+            raise ValueError(
+                "assigned style is type %s, need type %s"
+                % (style.type, WD_STYLE_TYPE.PARAGRAPH)
+            )
+        if style == self._default_para:
+            return None
+        return style.style_id
+
+
+def get_style_index(doc) -> StyleIndex:
+    """返回文档的样式索引；同一文档对象只构建一次，排版与校验共用。"""
+    index = getattr(doc, "_hr_style_index", None)
+    if index is None:
+        index = StyleIndex(doc)
+        doc._hr_style_index = index
+    return index
+
+
 def _get_or_add_style(doc, name: str, style_type=WD_STYLE_TYPE.PARAGRAPH):
-    if name in [s.name for s in doc.styles]:
-        return doc.styles[name]
-    return doc.styles.add_style(name, style_type)
+    index = get_style_index(doc)
+    style = index.get(name)
+    if style is not None:
+        return style
+    return index.add_style(name, style_type)
 
 
 def _set_para_fmt(style, size_pt: float, line_pt: float,
@@ -0,0 +1,236 @@
+import sys
+
+from docx import Document
+from docx.shared import Cm
+from docx.enum.text import WD_LINE_SPACING
+from docx.oxml.ns import qn
+
+from .specs import DEFAULT_SPEC, STYLE_NAMES
+from .footnote_ooxml import settings_has_footnote_restart
+from .style_factory import get_style_index
+from .cache import ResultCache
+
+_SPEC = DEFAULT_SPEC
+_TOL  = _SPEC.twip_tolerance
+
+PASS  = "PASS"
+FAIL  = "FAIL"
+WARN  = "WARN"
+
+
+def _approx(actual: int, expected: int, tol: int = _TOL) -> bool:
+    return abs(actual - expected) <= tol
+
+
+def _check(results: list, name: str, ok: bool, detail: str = "") -> None:
+    status = PASS if ok else FAIL
+    results.append((status, name, detail))
+
+
+def _warn(results: list, name: str, detail: str = "") -> None:
+    results.append((WARN, name, detail))
+
+
+class ValidationContext:
+    """校验上下文：.docx 只打开、解析一次，各规则共享文档、样式索引与 settings 部件。"""
+
+    def __init__(self, docx_path: str):
+        self.path = docx_path
+        self.doc = Document(docx_path)
+        self.styles = get_style_index(self.doc)
+        self.settings = self.doc.settings.element
+
+
+# ────────────────────────────── 规则实现 ──────────────────────────────────────
+
+def check_margins(ctx: ValidationContext, results: list) -> None:
+    sec = ctx.doc.sections[0]
+    pairs = [
+        ("margin_top",    int(sec.top_margin),    int(Cm(_SPEC.margin_top_cm))),
+        ("margin_bottom", int(sec.bottom_margin), int(Cm(_SPEC.margin_bottom_cm))),
+        ("margin_left",   int(sec.left_margin),   int(Cm(_SPEC.margin_left_cm))),
+        ("margin_right",  int(sec.right_margin),  int(Cm(_SPEC.margin_right_cm))),
+    ]
+    for name, actual, expected in pairs:
+        ok = _approx(actual, expected)
+        _check(results, f"margins/{name}",
+               ok, f"actual={actual} expected={expected} tol={_TOL}")
+
+
+def check_styles_exist(ctx: ValidationContext, results: list) -> None:
+    existing = ctx.styles
+    for key, name in STYLE_NAMES.items():
+        _check(results, f"style_exists/{name}", name in existing)
+
+
+def check_style_font_size(ctx: ValidationContext, results: list) -> None:
+    size_map = {
+        STYLE_NAMES["body"]:        _SPEC.body_pt,
+        STYLE_NAMES["title_main"]:  _SPEC.title_main_pt,
+        STYLE_NAMES["subtitle"]:    _SPEC.subtitle_pt,
+        STYLE_NAMES["section_l2"]:  _SPEC.section_l2_pt,
+        STYLE_NAMES["footnote"]:    _SPEC.footnote_pt,
+    }
+    existing = ctx.styles
+    for sname, expected_pt in size_map.items():
+        if sname not in existing:
+            _check(results, f"font_size/{sname}", False, "样式不存在")
+            continue
+        style = existing[sname]
+        actual_half = style.font.size  # EMU
+        if actual_half is None:
+            _check(results, f"font_size/{sname}", False, "font.size=None")
+            continue
+        actual_pt = actual_half / 12700
+        ok = abs(actual_pt - expected_pt) < 0.1
+        _check(results, f"font_size/{sname}",
+               ok, f"actual={actual_pt:.1f}pt expected={expected_pt}pt")
+
+
+def check_style_line_spacing(ctx: ValidationContext, results: list) -> None:
+    spacing_map = {
+        STYLE_NAMES["body"]:     _SPEC.body_line_pt,
+        STYLE_NAMES["footnote"]: _SPEC.footnote_line_pt,
+    }
+    existing = ctx.styles
+    for sname, expected_pt in spacing_map.items():
+        if sname not in existing:
+            _check(results, f"line_spacing/{sname}", False, "样式不存在")
+            continue
+        style = existing[sname]
+        pf = style.paragraph_format
+        rule_ok = pf.line_spacing_rule == WD_LINE_SPACING.EXACTLY
+        if not rule_ok:
+            _check(results, f"line_spacing/{sname}", False,
+                   f"rule={pf.line_spacing_rule} 期望 EXACTLY")
+            continue
+        actual_emu = pf.line_spacing
+        if actual_emu is None:
+            _check(results, f"line_spacing/{sname}", False, "line_spacing=None")
+            continue
+        actual_pt  = actual_emu / 12700
+        ok = abs(actual_pt - expected_pt) < 0.2
+        _check(results, f"line_spacing/{sname}",
+               ok, f"actual={actual_pt:.1f}pt expected={expected_pt}pt")
+
+
+def check_style_fonts(ctx: ValidationContext, results: list) -> None:
+    font_map = {
+        STYLE_NAMES["body"]: (
+            _SPEC.font_latin,
+            _SPEC.font_body_east,
+        ),
+        STYLE_NAMES["footnote"]: (
+            _SPEC.font_latin,
+            _SPEC.font_footnote_east,
+        ),
+    }
+    existing = ctx.styles
+    for sname, (expected_latin, expected_east) in font_map.items():
+        if sname not in existing:
+            _check(results, f"font/{sname}", False, "样式不存在")
+            continue
+        style = existing[sname]
+        rPr = style.element.rPr
+        if rPr is None:
+            _check(results, f"font/{sname}", False, "rPr=None")
+            continue
+        rf = rPr.find(qn("w:rFonts"))
+        if rf is None:
+            _check(results, f"font/{sname}", False, "rFonts=None")
+            continue
+        ascii_val = rf.get(qn("w:ascii"))
+        east_val  = rf.get(qn("w:eastAsia"))
+        latin_ok  = ascii_val == expected_latin
+        east_ok   = east_val  == expected_east
+        _check(results, f"font/{sname}/latin",
+               latin_ok, f"actual={ascii_val!r} expected={expected_latin!r}")
+        _check(results, f"font/{sname}/eastAsia",
+               east_ok,  f"actual={east_val!r} expected={expected_east!r}")
+
+
+def check_footnote_restart(ctx: ValidationContext, results: list) -> None:
+    ok = settings_has_footnote_restart(ctx.settings)
+    _check(results, "footnote/numRestart_eachPage", ok)
+
+
+def check_needs_review_italic(ctx: ValidationContext, results: list) -> None:
+    count = 0
+    for para in ctx.doc.paragraphs:
+        for run in para.runs:
+            if run.italic and "NEEDS_REVIEW" not in run.text:
+                count += 1
+    if count > 0:
+        _warn(results, "italic/needs_review",
+              f"{count} 个斜体 run 未标记 NEEDS_REVIEW，请人工核查 PAS 规则")
+    else:
+        results.append((PASS, "italic/needs_review", "无未标注斜体"))
+
+
+# ────────────────────────────── 主流程 ───────────────────────────────────────
+
+_CHECKS = (
+    check_margins,
+    check_styles_exist,
+    check_style_font_size,
+    check_style_line_spacing,
+    check_style_fonts,
+    check_footnote_restart,
+    check_needs_review_italic,
+)
+
+
+def validate(docx_path: str) -> list:
+    ctx = ValidationContext(docx_path)
+    results: list = []
+
+    for check in _CHECKS:
+        check(ctx, results)
+
+    return results
+
+
+def _print_report(results: list, out=None) -> int:
+    out = out or sys.stdout
+    width = max(len(r[1]) for r in results) + 2
+    fail_count = 0
+    warn_count = 0
+    for status, name, detail in results:
+        marker = {"PASS": "✅", "FAIL": "❌", "WARN": "⚠️ "}.get(status, "?")
+        line = f"  {marker} [{status}] {name:<{width}}"
+        if detail:
+            line += f"  {detail}"
+        print(line, file=out)
+        if status == FAIL:
+            fail_count += 1
+        elif status == WARN:
+            warn_count += 1
+
+    print(file=out)
+    total = len(results)
+    passed = total - fail_count - warn_count
+    print(f"结果: {passed}/{total} 通过  {fail_count} 失败  {warn_count} 警告", file=out)
+    return fail_count
+
+
+def validate_cached(docx_path: str, cache=None) -> list:
+    """带内容哈希缓存的校验；命中时直接返回缓存的结果元组列表。"""
+    if cache is None:
+        return validate(docx_path)
+
+    key = cache.key("validate", docx_path)
+    cached = cache.get_json(key)
+    if cached is not None:
+        return [tuple(r) for r in cached]
+    results = validate(docx_path)
+    cache.put_json(key, results)
+    return results
+
+
+def _validate_worker(docx_path: str, use_cache: bool = True) -> tuple:
+    """批量校验的单文件任务；无法解析的文件记为 ERROR，不中断整批。"""
+    try:
+        cache = ResultCache() if use_cache else None
+        return (docx_path, validate_cached(docx_path, cache), "")
+    except Exception as exc:  # noqa: BLE001
+        return (docx_path, None, f"{type(exc).__name__}: {exc}")
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+serve.py — 常驻排版 / 校验服务
+
+每份稿件都起一个 format_docx.py / validate_docx.py 子进程时，解释器启动与 python-docx
+导入反复发生。本服务常驻一个进程池（工作进程启动时即导入排版与校验模块），
+通过本机 HTTP 或 Unix socket 接收任务，一次往返返回输出路径与校验结果。
+
+接口（JSON）:
+    POST /format    {"input": "论文.docx", "output": "排版后.docx", "validate": true,
+                     "incremental": false, "real_footnotes": false, "cache": true, "strict": false}
+                    → {"status", "output", "cache_hit", "seconds", "validation": {...}}
+    POST /validate  {"input": "排版后.docx", "cache": true, "strict": false}
+                    → {"status", "seconds", "validation": {...}}
+    GET  /metrics   队列深度、已完成 / 失败 / 拒绝计数、各接口延迟 p50 / p95
+    GET  /health
+
+文件路径按服务进程的工作目录解析，建议传绝对路径。排队任务（含执行中）达到 --queue-limit
+时立即返回 503，调用方稍后重试。
+
+用法:
+    python3 serve.py                                  # 127.0.0.1:8765
+    python3 serve.py --port 9000 --jobs 4 --queue-limit 32
+    python3 serve.py --socket /tmp/hr-format.sock
+    curl --unix-socket /tmp/hr-format.sock -d '{"input": "/abs/论文.docx", "output": "/abs/排版后.docx"}' \\
+        http://localhost/format
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# ── 将 lib/ 加入查找路径 ────────────────────────────────────────────────────
+sys.path.insert(0, str(Path(__file__).parent))
+
+from lib.batch import default_jobs
+
+DEFAULT_PORT = 8765
+LATENCY_WINDOW = 1000
+MAX_BODY_BYTES = 64 * 1024
+
+
+# ── 工作进程侧 ──────────────────────────────────────────────────────────────
+
+def _warm_worker() -> None:
+    """进程池初始化：预先导入 python-docx 与排版 / 校验流程。"""
+    import lib.formatter  # noqa: F401
+    import lib.validation  # noqa: F401
+
+
+def _validation_record(path: str, use_cache: bool, strict: bool) -> dict:
+    from lib.cache import ResultCache
+    from lib.report_formats import to_record
+    from lib.validation import validate_cached
+
+    results = validate_cached(path, ResultCache() if use_cache else None)
+    return to_record(path, results, "", strict)
+
+
+def _format_job(input_path: str, output_path: str, options: dict) -> dict:
+    from lib.cache import ResultCache
+    from lib.formatter import format_cached
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    use_cache = options.get("cache", True)
+    hit = format_cached(Path(input_path), Path(output_path),
+                        ResultCache() if use_cache else None,
+                        bool(options.get("incremental")), bool(options.get("real_footnotes")))
+    reply = {"status": "OK", "output": output_path, "cache_hit": hit}
+    if options.get("validate", True):
+        record = _validation_record(output_path, use_cache, bool(options.get("strict")))
+        reply["validation"] = record
+        reply["status"] = record["status"]
+    return reply
+
+
+def _validate_job(input_path: str, options: dict) -> dict:
+    record = _validation_record(input_path, options.get("cache", True), bool(options.get("strict")))
+    return {"status": record["status"], "validation": record}
+
+
+# ── 服务侧 ─────────────────────────────────────────────────────────────────
+
+class _BadRequest(Exception):
+    pass
+
+
+class JobQueue:
+    """有界任务队列：进程池 + 计数信号量，满时拒绝而不是无限排队。"""
+
+    def __init__(self, jobs: int, queue_limit: int):
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.jobs = jobs
+        self.queue_limit = queue_limit
+        self._pool = ProcessPoolExecutor(max_workers=jobs, initializer=_warm_worker)
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._latency = {"format": deque(maxlen=LATENCY_WINDOW),
+                         "validate": deque(maxlen=LATENCY_WINDOW)}
+
+    def run(self, kind: str, fn, *args):
+        """提交并等待结果；队列已满返回 None。"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            return None
+        with self._lock:
+            self.in_flight += 1
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            result = self._pool.submit(fn, *args).result()
+            ok = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self.in_flight -= 1
+                if ok:
+                    self.completed += 1
+                    self._latency[kind].append(elapsed)
+                else:
+                    self.failed += 1
+            self._slots.release()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            latency = {kind: _percentiles(samples) for kind, samples in self._latency.items()}
+            return {
+                "workers": self.jobs,
+                "queue_limit": self.queue_limit,
+                "in_flight": self.in_flight,
+                "running": min(self.in_flight, self.jobs),
+                "queued": max(0, self.in_flight - self.jobs),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "latency_ms": latency,
+                "uptime_s": round(time.time() - self._started, 1),
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"count": 0, "p50": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    n = len(ordered)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(n - 1, int(q * n))] * 1000, 1)
+
+    return {"count": n, "p50": pick(0.50), "p95": pick(0.95), "max": round(ordered[-1] * 1000, 1)}
+
+
+def _docx_path(request: dict, key: str, must_exist: bool) -> str:
+    raw = request.get(key)
+    if not isinstance(raw, str) or not raw:
+        raise _BadRequest(f"缺少字段: {key}")
+    p = Path(raw).expanduser().resolve()
+    if p.suffix.lower() != ".docx":
+        raise _BadRequest(f"{key} 必须是 .docx 文件: {raw}")
+    if must_exist and not p.is_file():
+        raise _BadRequest(f"文件不存在: {raw}")
+    return str(p)
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "hr-format/1"
+    queue: JobQueue = None  # 由 main() 注入
+
+    def address_string(self) -> str:
+        # Unix socket 连接没有 (host, port)
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, fmt, *args) -> None:
+        if not getattr(self.server, "quiet", False):
+            super().log_message(fmt, *args)
+
+    def _reply(self, code: int, payload: dict, headers=None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path == "/metrics":
+            self._reply(200, self.queue.metrics())
+        elif self.path == "/health":
+            self._reply(200, {"status": "OK"})
+        else:
+            self._reply(404, {"status": "ERROR", "error": f"未知路径: {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path not in ("/format", "/validate"):
+            self._reply(404, {"status": "ERROR", "error": f"未知路径: {self.path}"})
+            return
+        try:
+            request = self._read_json()
+            if self.path == "/format":
+                kind, fn = "format", _format_job
+                args = (_docx_path(request, "input", True), _docx_path(request, "output", False), request)
+            else:
+                kind, fn = "validate", _validate_job
+                args = (_docx_path(request, "input", True), request)
+        except _BadRequest as exc:
+            self._reply(400, {"status": "ERROR", "error": str(exc)})
+            return
+
+        t0 = time.perf_counter()
+        try:
+            result = self.queue.run(kind, fn, *args)
+        except Exception as exc:  # noqa: BLE001 — 单个任务失败只影响本次请求
+            self._reply(500, {"status": "ERROR", "error": f"{type(exc).__name__}: {exc}"})
+            return
+        if result is None:
+            self._reply(503, {"status": "ERROR", "error": "队列已满，请稍后重试"},
+                        {"Retry-After": "1"})
+            return
+        result["seconds"] = round(time.perf_counter() - t0, 4)
+        self._reply(200, result)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            raise _BadRequest("请求体须为 JSON 对象")
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError as exc:
+            raise _BadRequest(f"JSON 解析失败: {exc}")
+        if not isinstance(request, dict):
+            raise _BadRequest("请求体须为 JSON 对象")
+        return request
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self) -> None:
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+
+def _clear_stale_socket(path: str) -> None:
+    """删除上次异常退出遗留的 socket 文件；路径被占用（非 socket 或仍有服务在监听）时报错退出。"""
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(st.st_mode):
+        print(f"ERROR: {path} 已存在且不是 socket，拒绝覆盖", file=sys.stderr)
+        sys.exit(1)
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    print(f"ERROR: {path} 上已有服务在监听", file=sys.stderr)
+    sys.exit(1)
+
+
+def _owns_socket(path: str, inode: int) -> bool:
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_ino == inode
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="常驻排版 / 校验服务（本机 HTTP 或 Unix socket）")
+    p.add_argument("--host", default="127.0.0.1", help="监听地址（默认 127.0.0.1）")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"监听端口（默认 {DEFAULT_PORT}）")
+    p.add_argument("--socket", metavar="PATH", help="改为监听 Unix socket")
+    p.add_argument("-j", "--jobs", type=int, default=default_jobs(),
+                   help="工作进程数（默认 CPU 核数）")
+    p.add_argument("--queue-limit", type=int,
+                   help="同时受理（含执行中）的任务上限，超出返回 503（默认 jobs × 4）")
+    p.add_argument("--quiet", action="store_true", help="不输出逐请求日志")
+    return p
+
+
+def main() -> None:
+    args = _build_parser().parse_args()
+    jobs = max(1, args.jobs)
+    queue_limit = args.queue_limit or jobs * 4
+    if queue_limit < 1:
+        print("ERROR: --queue-limit 必须为正整数", file=sys.stderr)
+        sys.exit(1)
+
+    socket_inode = None
+    if args.socket:
+        _clear_stale_socket(args.socket)
+        server = UnixHTTPServer(args.socket, Handler)
+        socket_inode = os.lstat(args.socket).st_ino
+        where = f"unix:{args.socket}"
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), Handler)
+        where = f"http://{args.host}:{server.server_port}"
+    server.quiet = args.quiet
+
+    Handler.queue = JobQueue(jobs, queue_limit)
+
+    def _stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"[服务] {where}  jobs={jobs}  queue-limit={queue_limit}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        Handler.queue.shutdown()
+        # 只删除本进程创建的 socket，路径已被他人替换时保留
+        if socket_inode is not None and _owns_socket(args.socket, socket_inode):
+            os.unlink(args.socket)
+        print("[服务] 已停止", flush=True)
+
+
+if __name__ == "__main__":
+    main()